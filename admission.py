@@ -0,0 +1,273 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Deque, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from aws_utils import get_aws_manager
+from config import GENERATION_ENDPOINTS, OUTPUT_S3_BUCKET
+from jobs import Job, JobTracker
+
+MAX_CONCURRENT_JOBS = int(os.environ.get("MAX_CONCURRENT_JOBS", 10))
+SUBMIT_RATE_PER_SECOND = float(os.environ.get("SUBMIT_RATE_PER_SECOND", 1.0))
+SUBMIT_BURST = int(os.environ.get("SUBMIT_BURST", 5))
+RETRY_BASE_SECONDS = 2
+RETRY_MAX_SECONDS = 60
+# Weight of the newest completion in a region's latency average.
+LATENCY_SMOOTHING = 0.3
+# Errors that mean "not now" rather than "never": the request is resubmitted.
+RETRYABLE_ERROR_CODES = (
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceQuotaExceededException",
+    "ServiceUnavailableException",
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, at most ``capacity`` banked"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def take(self):
+        self._tokens -= 1
+
+
+class Region:
+    """One generation endpoint: a region's Bedrock runtime, its output bucket and its own budget"""
+
+    def __init__(self, name: Optional[str], bucket: str, bedrock_runtime,
+                 max_concurrent: int = MAX_CONCURRENT_JOBS,
+                 rate: float = SUBMIT_RATE_PER_SECOND, burst: int = SUBMIT_BURST,
+                 submit_client=None):
+        self.name = name
+        self.bucket = bucket
+        # Polled by the tracker; jobs are started through ``submit_client``.
+        self.bedrock_runtime = bedrock_runtime
+        self.submit_client = submit_client or bedrock_runtime
+        self.max_concurrent = max_concurrent
+        self.limiter = TokenBucket(rate, burst)
+        self.retry_at = 0.0
+        # Set while a start_async_invoke to this region is in progress.
+        self.dispatching = False
+        # Smoothed seconds from start to completion; None until a job finishes here.
+        self.latency: Optional[float] = None
+
+    def observe_latency(self, seconds: float):
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += LATENCY_SMOOTHING * (seconds - self.latency)
+
+
+@dataclass
+class _Ticket:
+    job: Job
+    submit: Callable[[Region], str]
+    attempts: int = 0
+
+
+class SubmissionQueue:
+    """Process-wide gate in front of ``start_async_invoke``.
+
+    Requests are queued per session and dispatched round-robin across
+    sessions, so one heavy user (or a batch) cannot starve the booth. Each
+    dispatch goes to a region with a free concurrency slot (counted from
+    the tracker's in-flight jobs there) and a token from that region's rate
+    limiter, preferring the most free slots and then the fastest recent
+    completions. Each region submits on its own worker, one call at a time,
+    so a slow or throttled region never holds up dispatch to the others.
+    Throttling and quota errors back that region off and put the request
+    back at the head of its session's queue instead of surfacing to the
+    user.
+
+    Without ``regions`` there is a single region using the tracker's
+    default client and ``OUTPUT_S3_BUCKET``.
+    """
+
+    def __init__(self, tracker: JobTracker, max_concurrent: int = MAX_CONCURRENT_JOBS,
+                 rate: float = SUBMIT_RATE_PER_SECOND, burst: int = SUBMIT_BURST,
+                 regions: Optional[List[Region]] = None):
+        self.tracker = tracker
+        self.regions = regions or [Region(None, OUTPUT_S3_BUCKET, tracker._bedrock_runtime, max_concurrent, rate, burst)]
+        for region in self.regions:
+            if region.name is not None:
+                tracker.add_region(region.name, region.bedrock_runtime)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._sessions: "OrderedDict[str, Deque[_Ticket]]" = OrderedDict()
+        self._workers = {
+            region: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"submit-{region.name or 'default'}")
+            for region in self.regions
+        }
+        tracker.add_listener(self._on_job_event)
+        self._thread = threading.Thread(target=self._run, name="submission-queue", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, session_id: str, submit: Callable[[Region], str]) -> Job:
+        """Queue ``submit`` (which starts the job in the given region and returns its ARN) and return its job"""
+        job = self.tracker.enqueue()
+        with self._lock:
+            self._sessions.setdefault(session_id, deque()).append(_Ticket(job, submit))
+        self._wakeup.set()
+        return job
+
+    def position(self, job: Job) -> Optional[int]:
+        """1-based place of ``job`` in dispatch order, or None if it is not queued"""
+        with self._lock:
+            queues = list(self._sessions.values())
+            for index, queue in enumerate(queues):
+                for depth, ticket in enumerate(queue):
+                    if ticket.job is job:
+                        # Round-robin: sessions ahead in the rotation get one
+                        # more turn than sessions behind before this depth.
+                        ahead = depth + sum(
+                            min(len(other), depth + 1 if other_index < index else depth)
+                            for other_index, other in enumerate(queues)
+                            if other_index != index
+                        )
+                        return ahead + 1
+        return None
+
+    def queued(self) -> int:
+        with self._lock:
+            return sum(len(queue) for queue in self._sessions.values())
+
+    def _next_ticket(self) -> Tuple[str, _Ticket]:
+        with self._lock:
+            session_id, queue = next(iter(self._sessions.items()))
+            ticket = queue.popleft()
+            del self._sessions[session_id]
+            if queue:
+                # Move the session to the back of the rotation.
+                self._sessions[session_id] = queue
+            return session_id, ticket
+
+    def _requeue(self, session_id: str, ticket: _Ticket):
+        with self._lock:
+            queue = self._sessions.pop(session_id, deque())
+            queue.appendleft(ticket)
+            self._sessions[session_id] = queue
+            self._sessions.move_to_end(session_id, last=False)
+
+    def free_slots(self, region: Region) -> int:
+        return region.max_concurrent - self.tracker.in_flight(region.name)
+
+    def _on_job_event(self, job: Job):
+        if job.status == "Completed" and job.completed_at:
+            for region in self.regions:
+                if region.name == job.region:
+                    region.observe_latency(job.completed_at - job.submitted_at)
+        self._wakeup.set()
+
+    def _open_regions(self) -> List[Region]:
+        return [region for region in self.regions if not region.dispatching and self.free_slots(region) > 0]
+
+    def _delay(self) -> Optional[float]:
+        """Seconds until a dispatch may happen, or None to wait for a wakeup"""
+        regions = self._open_regions()
+        if not self.queued() or not regions:
+            return None
+        now = time.monotonic()
+        return min(max(region.retry_at - now, region.limiter.wait_time()) for region in regions)
+
+    def _pick_region(self) -> Optional[Region]:
+        now = time.monotonic()
+        ready = [
+            region for region in self._open_regions()
+            if region.retry_at <= now and region.limiter.wait_time() == 0
+        ]
+        if not ready:
+            return None
+        # Most free slots first; among equals, the region finishing jobs fastest.
+        return max(ready, key=lambda region: (self.free_slots(region), -(region.latency or 0.0)))
+
+    def _run(self):
+        while True:
+            delay = self._delay()
+            region = self._pick_region() if delay is not None and delay <= 0 else None
+            if region is None:
+                # Completions and new requests set the event; the timeout
+                # covers rate-limit refill and retry backoff.
+                self._wakeup.wait(timeout=delay if delay else 1.0)
+                self._wakeup.clear()
+                continue
+            session_id, ticket = self._next_ticket()
+            region.limiter.take()
+            region.dispatching = True
+            self._workers[region].submit(self._dispatch, session_id, ticket, region)
+
+    def _dispatch(self, session_id: str, ticket: _Ticket, region: Region):
+        try:
+            self._submit(session_id, ticket, region)
+        finally:
+            region.dispatching = False
+            self._wakeup.set()
+
+    def _submit(self, session_id: str, ticket: _Ticket, region: Region):
+        ticket.attempts += 1
+        try:
+            invocation_arn = ticket.submit(region)
+        except ClientError as e:
+            code = e.response["Error"]["Code"]
+            if code in RETRYABLE_ERROR_CODES:
+                # Only this region backs off; others keep taking work.
+                backoff = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (ticket.attempts - 1))
+                region.retry_at = time.monotonic() + random.uniform(backoff / 2, backoff)
+                logger.info("Submission throttled in %s (%s), retrying in up to %ss", region.name, code, backoff)
+                self._requeue(session_id, ticket)
+                return
+            self.tracker.fail(ticket.job, str(e))
+            return
+        except Exception as e:
+            self.tracker.fail(ticket.job, str(e))
+            return
+        self.tracker.start(ticket.job, invocation_arn, region.name)
+
+
+def configured_regions() -> List[Region]:
+    """The ``GENERATION_ENDPOINTS`` pool, each region using its shared AWS manager"""
+    return [
+        Region(
+            endpoint["region"],
+            endpoint["bucket"],
+            get_aws_manager(endpoint["region"]).bedrock_runtime,
+            endpoint.get("max_concurrent", MAX_CONCURRENT_JOBS),
+            endpoint.get("rate", SUBMIT_RATE_PER_SECOND),
+            endpoint.get("burst", SUBMIT_BURST),
+            submit_client=get_aws_manager(endpoint["region"]).bedrock_submit
+        )
+        for endpoint in GENERATION_ENDPOINTS
+    ]
+
+
+_queue: Optional[SubmissionQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_submission_queue(tracker: JobTracker) -> SubmissionQueue:
+    """Return the process-wide submission queue, creating it on first use"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = SubmissionQueue(tracker, regions=configured_regions())
+        return _queue
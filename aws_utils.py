@@ -1,60 +1,167 @@
 import boto3
 import streamlit as st
-from typing import List
-import tempfile
-from PIL import Image
-import io
+from typing import List, Optional, Tuple
+import logging
+import threading
+from botocore.config import Config
+from catalog import get_catalog_index, load_prepared_image
+from config import CATALOG_BUCKET, GENERATION_ENDPOINTS, OUTPUT_S3_BUCKET
+from image_pipeline import prepare_image
+from metrics import timed
+from presign import BROWSER_CACHE_CONTROL, get_presigned_url_cache
+
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+CATALOG_PAGE_SIZE = 12
+
+# Clients are shared by every session thread, so the pool must cover peak
+# concurrency; adaptive retries add client-side rate limiting on throttles.
+CLIENT_CONFIG = Config(
+    max_pool_connections=64,
+    tcp_keepalive=True,
+    connect_timeout=5,
+    read_timeout=60,
+    retries={"mode": "adaptive", "max_attempts": 5}
+)
+# For start_async_invoke: the submission queue retries throttles with its own
+# per-region backoff, so botocore must not block its worker doing the same.
+SUBMIT_RETRIES = {"mode": "standard", "total_max_attempts": 1}
+
+logger = logging.getLogger(__name__)
 
 class AWSManager:
-    def __init__(self, region="us-east-1"):
+    def __init__(self, region="us-east-1", config=CLIENT_CONFIG):
         self.region = region
-        self.bedrock_runtime = boto3.client("bedrock-runtime", region_name=region)
-        self.s3_client = boto3.client("s3", region_name=region)
+        # boto3 sessions are not thread-safe but the clients built from them are.
+        session = boto3.session.Session(region_name=region)
+        self.bedrock_runtime = session.client("bedrock-runtime", config=config)
+        self.bedrock_submit = session.client("bedrock-runtime", config=config.merge(Config(retries=SUBMIT_RETRIES)))
+        self.s3_client = session.client("s3", config=config)
+
+    def warm_up(self, buckets=(CATALOG_BUCKET, OUTPUT_S3_BUCKET)):
+        """Resolve credentials and open pooled TLS connections ahead of the first user"""
+        for bucket in buckets:
+            try:
+                self.s3_client.head_bucket(Bucket=bucket)
+            except Exception as e:
+                logger.warning("S3 warm-up failed for %s: %s", bucket, e)
+        try:
+            self.bedrock_runtime.list_async_invokes(maxResults=1)
+        except Exception as e:
+            logger.warning("Bedrock warm-up failed: %s", e)
 
     def get_product_images_from_s3(self, bucket_name: str, prefix: str) -> List[dict]:
-        """Fetch product images from S3 bucket"""
+        """Fetch product images from S3 bucket via the shared catalog index"""
         try:
-            response = self.s3_client.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
-            products = []
-            for obj in response.get('Contents', []):
-                if obj['Key'].lower().endswith(('.png', '.jpg', '.jpeg')):
-                    url = self.s3_client.generate_presigned_url('get_object',
-                        Params={'Bucket': bucket_name, 'Key': obj['Key']},
-                        ExpiresIn=3600)
-                    
-                    product_name = obj['Key'].split('/')[-1].split('.')[0].replace('_', ' ').title()
-                    
-                    products.append({
-                        'name': product_name,
-                        'image_url': url,
-                        'key': obj['Key']
-                    })
-            return products
+            products = get_catalog_index(bucket_name, prefix).products(self.s3_client)
+            return [{**product, 'image_url': self.presign_catalog_image(bucket_name, product['key'])} for product in products]
         except Exception as e:
             st.error(f"Error fetching products from S3: {str(e)}")
             return []
 
+    def list_products(self, bucket_name: str, prefix: str) -> List[dict]:
+        """Names, keys and ETags from the shared catalog index, without presigning"""
+        try:
+            return get_catalog_index(bucket_name, prefix).products(self.s3_client)
+        except Exception as e:
+            st.error(f"Error fetching products from S3: {str(e)}")
+            return []
+
+    def get_product_page(self, bucket_name: str, prefix: str, query: str = "", page: int = 0,
+                         page_size: int = CATALOG_PAGE_SIZE) -> Tuple[List[dict], int]:
+        """Return one page of products matching ``query`` (with URLs) and the total match count.
+
+        Only the products on the requested page are presigned.
+        """
+        products = self.list_products(bucket_name, prefix)
+        query = query.strip().lower()
+        if query:
+            products = [product for product in products if query in product['name'].lower()]
+        start = page * page_size
+        page_products = [
+            {**product, 'image_url': self.presign_catalog_image(bucket_name, product['key'])}
+            for product in products[start:start + page_size]
+        ]
+        return page_products, len(products)
+
+    def presign_catalog_image(self, bucket: str, key: str) -> str:
+        """Stable, browser-cacheable URL for a catalog image"""
+        return get_presigned_url_cache().get(
+            self.s3_client, bucket, key,
+            ResponseCacheControl=BROWSER_CACHE_CONTROL
+        )
+
     def load_image_from_s3(self, bucket: str, key: str) -> bytes:
         """Load an image from S3 and return as bytes"""
         try:
-            response = self.s3_client.get_object(Bucket=bucket, Key=key)
-            image_content = response['Body'].read()
+            with timed("s3_load_image"):
+                response = self.s3_client.get_object(Bucket=bucket, Key=key)
+                image_content = response['Body'].read()
             
-            # Verify the image can be opened
-            Image.open(io.BytesIO(image_content))
+            # Decoding here both verifies the image and warms the prepared
+            # preview and model payload for the rest of the session.
+            prepare_image(image_content)
             
             return image_content
         except Exception as e:
             st.error(f"Error loading image from S3: {str(e)}")
             return None
 
-    def generate_presigned_url(self, s3_uri):
+    def load_model_ready_image(self, bucket: str, key: str, etag: str) -> Optional[bytes]:
+        """A catalog product's precomputed model-ready JPEG, or None if it has not been built.
+
+        It is squashed to the model's 1280x720 frame, so it is only used for
+        the model payload; selections show the original.
+        """
+        return load_prepared_image(self.s3_client, bucket, key, etag)
+
+    def s3_for_bucket(self, bucket: str):
+        """S3 client for ``bucket``'s region; output buckets live in their generation region"""
+        for endpoint in GENERATION_ENDPOINTS:
+            if endpoint["bucket"] == bucket and endpoint["region"] != self.region:
+                return get_aws_manager(endpoint["region"]).s3_client
+        return self.s3_client
+
+    def get_output_location(self, s3_uri):
+        """Return the (bucket, key) of the video a job wrote under ``s3_uri``"""
         s3_parts = s3_uri.replace("s3://", "").split("/", 1)
-        bucket_name = s3_parts[0]
-        object_key = s3_parts[1] + "/output.mp4"
-        presigned_url = self.s3_client.generate_presigned_url(
-            "get_object",
-            Params={"Bucket": bucket_name, "Key": object_key},
-            ExpiresIn=3600 * 24
-        )
-        return presigned_url
+        return s3_parts[0], s3_parts[1] + "/output.mp4"
+
+    def generate_presigned_url(self, s3_uri, download_name=None):
+        """Presign the output video; with ``download_name`` S3 serves it as an attachment"""
+        bucket_name, object_key = self.get_output_location(s3_uri)
+        params = {}
+        if download_name:
+            params["ResponseContentDisposition"] = f'attachment; filename="{download_name}"'
+        return get_presigned_url_cache().get(self.s3_for_bucket(bucket_name), bucket_name, object_key,
+                                             expires=3600 * 24, **params)
+
+    def iter_object_chunks(self, bucket: str, key: str, chunk_size: int = DOWNLOAD_CHUNK_SIZE):
+        """Yield an S3 object in ranged GETs so it is never held in memory whole"""
+        s3_client = self.s3_for_bucket(bucket)
+        head = s3_client.head_object(Bucket=bucket, Key=key)
+        size = head["ContentLength"]
+        for start in range(0, size, chunk_size):
+            end = min(start + chunk_size, size) - 1
+            with timed("s3_range_get"):
+                response = s3_client.get_object(
+                    Bucket=bucket,
+                    Key=key,
+                    Range=f"bytes={start}-{end}",
+                    IfMatch=head["ETag"]
+                )
+                chunk = response["Body"].read()
+            yield chunk
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_aws_manager(region="us-east-1") -> AWSManager:
+    """Return the process-wide manager for ``region``, warming it up in the background on first use"""
+    with _managers_lock:
+        manager = _managers.get(region)
+        if manager is None:
+            manager = _managers[region] = AWSManager(region)
+            threading.Thread(target=manager.warm_up, name=f"aws-warm-up-{region}", daemon=True).start()
+        return manager
@@ -0,0 +1,217 @@
+"""Batch video generation across catalog products and prompts.
+
+Usable from the Batch tab or headless::
+
+    python batch.py --category "Food & Beverages" --prompt "..." --output manifest.json
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from catalog import get_catalog_index, load_prepared_image
+from config import AWS_REGION, CATALOG_BUCKET, PRODUCT_CATEGORIES
+from generation import default_prompt, submit_video_job
+from image_pipeline import prepare_image
+from jobs import Job
+
+DEFAULT_MAX_IN_FLIGHT = 5
+PREPARE_WORKERS = 8
+BATCH_POLL_SECONDS = 5
+# Finished runs stay viewable in the Batch tab this long, and at most this many.
+BATCH_RETENTION_SECONDS = 3600
+MAX_FINISHED_BATCHES = 20
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchItem:
+    product_name: str
+    product_key: str
+    prompt: str
+    base64_image: Optional[str] = None
+    job: Optional[Job] = None
+    error: Optional[str] = None
+
+    @property
+    def status(self) -> str:
+        if self.error:
+            return "Failed"
+        if self.job is None:
+            return "Pending"
+        return self.job.status
+
+    @property
+    def done(self) -> bool:
+        return self.error is not None or (self.job is not None and self.job.done)
+
+    def to_manifest(self) -> dict:
+        entry = {
+            "product": self.product_name,
+            "key": self.product_key,
+            "prompt": self.prompt,
+            "status": self.status,
+            "invocationArn": self.job.invocation_arn if self.job else None,
+            "outputUri": f"{self.job.s3_uri}/output.mp4" if self.job and self.job.s3_uri else None,
+        }
+        if self.error or (self.job and self.job.failure_message):
+            entry["error"] = self.error or self.job.failure_message
+        return entry
+
+
+def resolve_prefix(category: str) -> str:
+    """Accept either a PRODUCT_CATEGORIES name or a raw S3 prefix"""
+    return PRODUCT_CATEGORIES.get(category, category)
+
+
+class BatchRun:
+    """Generate one video per product × prompt with a bounded number of jobs in flight.
+
+    Reference images are prepared in parallel up front; jobs are then
+    submitted as in-flight slots free up. ``run`` blocks until every item
+    settles, ``start`` does the same on a background thread.
+    """
+
+    def __init__(self, aws_manager, category: str, prompts: List[str],
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, bucket: str = CATALOG_BUCKET):
+        self.batch_id = uuid.uuid4().hex
+        self.aws_manager = aws_manager
+        self.category = category
+        self.prefix = resolve_prefix(category)
+        self.prompts = [p for p in prompts if p.strip()]
+        self.max_in_flight = max(1, max_in_flight)
+        self.bucket = bucket
+        self.items: List[BatchItem] = []
+        self.finished = False
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def start(self) -> "BatchRun":
+        threading.Thread(target=self.run, name=f"batch-{self.batch_id[:8]}", daemon=True).start()
+        return self
+
+    def run(self) -> List[dict]:
+        try:
+            products = get_catalog_index(self.bucket, self.prefix).products(self.aws_manager.s3_client)
+            self.items = [
+                BatchItem(product['name'], product['key'], prompt)
+                for product in products
+                for prompt in (self.prompts or [default_prompt(product['name'])])
+            ]
+            self._prepare_images(products)
+            self._submit_all()
+        finally:
+            self.finished_at = time.time()
+            self.finished = True
+        return self.manifest()
+
+    def manifest(self) -> List[dict]:
+        return [item.to_manifest() for item in self.items]
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for item in self.items:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        return counts
+
+    def _prepare_images(self, products: List[dict]):
+        def prepare(product):
+            try:
+                s3_client = self.aws_manager.s3_client
+                body = load_prepared_image(s3_client, self.bucket, product['key'], product['etag'])
+                if body is None:
+                    body = s3_client.get_object(Bucket=self.bucket, Key=product['key'])['Body'].read()
+                return product['key'], prepare_image(body).model_payload, None
+            except Exception as e:
+                return product['key'], None, str(e)
+
+        with ThreadPoolExecutor(max_workers=PREPARE_WORKERS, thread_name_prefix="batch-prepare") as pool:
+            prepared = {key: (payload, error) for key, payload, error in pool.map(prepare, products)}
+        for item in self.items:
+            item.base64_image, item.error = prepared[item.product_key]
+
+    def _submit(self, item: BatchItem):
+        try:
+            # The whole batch is one session, so it takes turns with interactive users.
+            item.job = submit_video_job(self.aws_manager, item.prompt, item.base64_image,
+                                        session_id=f"batch-{self.batch_id}")
+        except Exception as e:
+            item.error = str(e)
+        finally:
+            # The payload is only needed for submission; finished batches would pin it otherwise.
+            item.base64_image = None
+
+    def _submit_all(self):
+        queue = [item for item in self.items if item.error is None]
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="batch-submit") as pool:
+            while True:
+                in_flight = sum(1 for item in self.items if item.job is not None and not item.job.done)
+                free = self.max_in_flight - in_flight
+                batch, queue = queue[:free], queue[free:]
+                list(pool.map(self._submit, batch))
+                if not queue and all(item.done for item in self.items):
+                    return
+                time.sleep(BATCH_POLL_SECONDS)
+
+
+_runs: Dict[str, BatchRun] = {}
+_runs_lock = threading.Lock()
+
+
+def start_batch(aws_manager, category: str, prompts: List[str], max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> BatchRun:
+    """Start a batch in the background and register it for later reruns"""
+    batch = BatchRun(aws_manager, category, prompts, max_in_flight)
+    with _runs_lock:
+        _prune_runs()
+        _runs[batch.batch_id] = batch
+    return batch.start()
+
+
+def _prune_runs():
+    """Forget finished runs past ``BATCH_RETENTION_SECONDS``, keeping at most ``MAX_FINISHED_BATCHES``"""
+    cutoff = time.time() - BATCH_RETENTION_SECONDS
+    finished = sorted((run for run in _runs.values() if run.finished), key=lambda run: run.finished_at)
+    for index, run in enumerate(finished):
+        if run.finished_at < cutoff or index < len(finished) - MAX_FINISHED_BATCHES:
+            del _runs[run.batch_id]
+
+
+def get_batch(batch_id: str) -> Optional[BatchRun]:
+    with _runs_lock:
+        return _runs.get(batch_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate videos for every product in a catalog category.")
+    parser.add_argument("--category", required=True,
+                        help=f"One of {', '.join(PRODUCT_CATEGORIES)} or a raw S3 prefix")
+    parser.add_argument("--prompt", action="append", default=[],
+                        help="Prompt to render for every product; repeat for a product × prompt matrix")
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT)
+    parser.add_argument("--region", default=AWS_REGION,
+                        help="Region of the catalog bucket; jobs are routed across GENERATION_ENDPOINTS")
+    parser.add_argument("--output", help="Write the manifest JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from aws_utils import AWSManager
+
+    batch = BatchRun(AWSManager(args.region), args.category, args.prompt, args.max_in_flight)
+    manifest = batch.run()
+    logger.info("Batch finished: %s", batch.counts())
+    output = json.dumps(manifest, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
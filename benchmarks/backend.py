@@ -0,0 +1,123 @@
+"""Wires the app's shared singletons to moto S3 and a fake Bedrock runtime.
+
+Import this before any app module: it sets the environment those modules
+read at import time.
+"""
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+os.environ["OPS_PORT"] = "0"
+os.environ["THUMBNAIL_CACHE_DIR"] = tempfile.mkdtemp(prefix="summit-bench-thumbnails-")
+os.environ["JOB_STORE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="summit-bench-jobs-"), "jobs.sqlite3")
+
+import admission
+import aws_utils
+import completions
+import config
+import jobs
+import result_cache
+from benchmarks.fakes import FakeBedrockRuntime, synthetic_image
+from config import AWS_REGION, CATALOG_BUCKET, OUTPUT_S3_BUCKET, OUTPUT_S3_PREFIX, PRODUCT_CATEGORIES
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+LISTING_PREFIX = "bench/listing/"
+UI_PRODUCTS = 24
+REGIONS = ("us-east-1", "us-west-2", "eu-west-1", "ap-northeast-1")
+
+
+def populate_s3(s3_client, listing_objects: int = 0, ui_products: int = UI_PRODUCTS):
+    """Create the app's buckets, real images for every category and a bulk listing prefix"""
+    for bucket in (CATALOG_BUCKET, OUTPUT_S3_BUCKET):
+        s3_client.create_bucket(Bucket=bucket)
+    uploads = [
+        (f"{prefix}product_{i:02d}.png", synthetic_image((1024, 1024), seed=i))
+        for prefix in PRODUCT_CATEGORIES.values()
+        for i in range(ui_products)
+    ]
+    # Listing cost does not depend on object size, so these stay tiny.
+    uploads += [(f"{LISTING_PREFIX}product_{i:05d}.png", b"\x89PNG") for i in range(listing_objects)]
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(lambda item: s3_client.put_object(Bucket=CATALOG_BUCKET, Key=item[0], Body=item[1]), uploads))
+
+
+def enable_completion_events(endpoint: dict):
+    """Send the endpoint's output-bucket ObjectCreated events to a new moto SQS queue"""
+    import boto3
+
+    sqs_client = boto3.client("sqs", region_name=endpoint["region"])
+    queue_url = sqs_client.create_queue(QueueName=f"completions-{endpoint['region']}")["QueueUrl"]
+    queue_arn = sqs_client.get_queue_attributes(QueueUrl=queue_url, AttributeNames=["QueueArn"])["Attributes"]["QueueArn"]
+    boto3.client("s3", region_name=endpoint["region"]).put_bucket_notification_configuration(
+        Bucket=endpoint["bucket"],
+        NotificationConfiguration={"QueueConfigurations": [{
+            "QueueArn": queue_arn,
+            "Events": ["s3:ObjectCreated:*"],
+            "Filter": {"Key": {"FilterRules": [{"Name": "prefix", "Value": OUTPUT_S3_PREFIX},
+                                               {"Name": "suffix", "Value": "output.mp4"}]}}
+        }]}
+    )
+    endpoint["completion_queue_url"] = queue_url
+
+
+def _skip_warm_up(self, buckets=()):
+    pass
+
+
+def start_offline_backend(fakes: List[FakeBedrockRuntime], max_concurrent: int, listing_objects: int = 0,
+                          completion_events: bool = False):
+    """Start moto and install one fake Bedrock region per entry in ``fakes``; return the primary manager
+
+    Each region gets its own output bucket and a ``max_concurrent`` budget
+    in the submission queue, mirroring ``GENERATION_ENDPOINTS``. With
+    ``completion_events``, job completion comes from S3 events on moto SQS
+    and polling drops to the fallback rate.
+    """
+    import boto3
+    from moto import mock_aws
+
+    # There is nothing to warm up offline, and moto has no Bedrock control
+    # plane; every manager created from here on (including by prewarm or
+    # get_aws_manager for an unregistered region) skips it.
+    aws_utils.AWSManager.warm_up = _skip_warm_up
+    # Left running until exit so background threads (prewarm, thumbnails)
+    # never reach real AWS.
+    mock_aws().start()
+    populate_s3(boto3.client("s3", region_name=AWS_REGION), listing_objects)
+
+    config.GENERATION_ENDPOINTS[:] = [
+        {"region": region, "bucket": OUTPUT_S3_BUCKET if region == AWS_REGION else f"{OUTPUT_S3_BUCKET}-{region}"}
+        for region in ([AWS_REGION] + [region for region in REGIONS if region != AWS_REGION])[:len(fakes)]
+    ]
+    regions = []
+    for endpoint, fake in zip(config.GENERATION_ENDPOINTS, fakes):
+        aws_manager = aws_utils.AWSManager(endpoint["region"])
+        aws_manager.bedrock_runtime = fake
+        if endpoint["region"] != AWS_REGION:
+            aws_manager.s3_client.create_bucket(
+                Bucket=endpoint["bucket"],
+                CreateBucketConfiguration={"LocationConstraint": endpoint["region"]}
+            )
+        if fake.s3_client is None:
+            fake.s3_client = aws_manager.s3_client
+        with aws_utils._managers_lock:
+            aws_utils._managers[endpoint["region"]] = aws_manager
+        regions.append(admission.Region(endpoint["region"], endpoint["bucket"], fake,
+                                        max_concurrent=max_concurrent, rate=1000, burst=max_concurrent))
+        if completion_events:
+            enable_completion_events(endpoint)
+
+    # Polling scaled down to the simulated job duration.
+    duration = fakes[0].duration
+    tracker = jobs.JobTracker(fakes[0], min_interval=duration / 20,
+                              max_interval=duration / 4, expected_duration=duration)
+    jobs._tracker = tracker
+    admission._queue = admission.SubmissionQueue(tracker, regions=regions)
+    completions.start_completion_listeners(tracker)
+    result_cache._cache = None
+    return aws_utils.get_aws_manager(AWS_REGION)
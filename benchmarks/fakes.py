@@ -0,0 +1,120 @@
+"""Offline stand-ins used by the benchmarks: a fake ``bedrock-runtime`` and synthetic images."""
+import io
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+
+from botocore.exceptions import ClientError
+from PIL import Image
+
+PLACEHOLDER_VIDEO = b"\x00" * 256 * 1024
+
+
+def synthetic_image(size: Tuple[int, int], mode: str = "RGB", fmt: str = "PNG", seed: int = 0) -> bytes:
+    """Deterministic, non-trivially compressible test image"""
+    rng = random.Random(seed)
+    img = Image.effect_noise(size, 64).convert("RGB")
+    img = Image.blend(img, Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3))), 0.5)
+    if mode == "P":
+        img = img.convert("P", palette=Image.ADAPTIVE)
+    elif mode != "RGB":
+        img = img.convert(mode)
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+class FakeBedrockRuntime:
+    """Simulates the Nova Reel async-invoke API.
+
+    ``start_latency`` is added to every ``start_async_invoke`` call, jobs
+    complete ``duration`` seconds after they start, ``failure_rate`` of
+    them end as Failed and ``throttle_rate`` of start calls raise a
+    ThrottlingException. Outcomes come from a seeded RNG so runs repeat.
+    With ``s3_client`` set, a placeholder ``output.mp4`` is written when
+    each successful job completes, as Bedrock does, so downloads and S3
+    completion events can be exercised too.
+    """
+
+    def __init__(self, duration: float = 1.0, start_latency: float = 0.05,
+                 failure_rate: float = 0.0, throttle_rate: float = 0.0, seed: int = 0,
+                 s3_client=None):
+        self.duration = duration
+        self.s3_client = s3_client
+        self.start_latency = start_latency
+        self.failure_rate = failure_rate
+        self.throttle_rate = throttle_rate
+        self.calls: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, dict] = {}
+
+    def _count(self, operation: str):
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+
+    def start_async_invoke(self, modelId, modelInput, outputDataConfig, **kwargs):
+        self._count("start_async_invoke")
+        time.sleep(self.start_latency)
+        with self._lock:
+            throttled = self._rng.random() < self.throttle_rate
+            failed = self._rng.random() < self.failure_rate
+        if throttled:
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+                              "StartAsyncInvoke")
+        job_id = uuid.uuid4().hex[:12]
+        arn = f"arn:aws:bedrock:us-east-1:000000000000:async-invoke/{job_id}"
+        output_uri = outputDataConfig["s3OutputDataConfig"]["s3Uri"].rstrip("/") + "/" + job_id
+        if self.s3_client is not None and not failed:
+            bucket, prefix = output_uri.replace("s3://", "").split("/", 1)
+            writer = threading.Timer(self.duration, self.s3_client.put_object,
+                                     kwargs={"Bucket": bucket, "Key": f"{prefix}/output.mp4", "Body": PLACEHOLDER_VIDEO})
+            writer.daemon = True
+            writer.start()
+        with self._lock:
+            self._jobs[arn] = {"started": time.time(), "failed": failed, "uri": output_uri}
+        return {"invocationArn": arn}
+
+    def _summary(self, arn: str) -> dict:
+        job = self._jobs[arn]
+        status = "InProgress"
+        if time.time() - job["started"] >= self.duration:
+            status = "Failed" if job["failed"] else "Completed"
+        summary = {
+            "invocationArn": arn,
+            "status": status,
+            "submitTime": datetime.fromtimestamp(job["started"], timezone.utc),
+            "outputDataConfig": {"s3OutputDataConfig": {"s3Uri": job["uri"]}},
+        }
+        if status == "Failed":
+            summary["failureMessage"] = "Simulated failure"
+        return summary
+
+    def get_async_invoke(self, invocationArn):
+        self._count("get_async_invoke")
+        with self._lock:
+            return self._summary(invocationArn)
+
+    def list_async_invokes(self, statusEquals=None, submitTimeAfter=None, **kwargs):
+        self._count("list_async_invokes")
+        with self._lock:
+            summaries = [self._summary(arn) for arn in self._jobs]
+        if statusEquals:
+            summaries = [s for s in summaries if s["status"] == statusEquals]
+        if submitTimeAfter:
+            summaries = [s for s in summaries if s["submitTime"] >= submitTimeAfter]
+        return {"asyncInvokeSummaries": summaries}
+
+    def get_paginator(self, operation_name: str):
+        return _SinglePagePaginator(getattr(self, operation_name))
+
+
+class _SinglePagePaginator:
+    def __init__(self, operation):
+        self._operation = operation
+
+    def paginate(self, **kwargs):
+        yield self._operation(**kwargs)
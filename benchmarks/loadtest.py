@@ -0,0 +1,296 @@
+"""Concurrent-session load test for ``main.py``.
+
+Every simulated user is its own ``AppTest`` driving a realistic flow
+against moto S3 and the fake Bedrock runtime: browse a category, select a
+product, tweak the prompt, generate, wait for the video and download it.
+Session counts are stepped up, and each step reports rerun latency
+percentiles, thread usage, peak RSS and Bedrock/S3 call counts::
+
+    python -m benchmarks.loadtest --sessions 10,50,100,200 --output load.json
+
+All sessions share one process, as they do on a real instance, so the step
+where latency or failures climb is roughly where one instance gives out.
+The per-stage means show which code path got slow first.
+
+``AppTest`` swaps process-wide Streamlit state (the runtime singleton and
+config) on every run, so script runs are serialized here. Sessions still
+overlap everywhere else, and ``rerun`` latency includes the wait for a
+turn, much like script threads contending for the GIL on one instance;
+``script`` is the run alone. AppTest also gives every session the same
+Streamlit session id, so per-session fairness in the submission queue is
+not exercised. It also runs the whole script on every interaction, where a
+browser would rerun only the fragment that was used, so ``script`` is an
+upper bound on per-click cost.
+"""
+import argparse
+import json
+import random
+import re
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+# Sets the environment the app modules read at import time, so it goes first.
+from benchmarks.backend import APP_PATH, start_offline_backend
+
+import boto3
+
+from benchmarks.fakes import FakeBedrockRuntime
+from benchmarks.run import summarize
+from config import AWS_REGION, GENERATION_ENDPOINTS, PRODUCT_CATEGORIES
+from jobs import get_job_tracker
+from metrics import STAGE_DURATION
+
+SAMPLE_INTERVAL_SECONDS = 0.25
+_apptest_lock = threading.Lock()
+DOWNLOAD_LINK = re.compile(r'href="([^"]*response-content-disposition[^"]*)"')
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2 ** 20
+    except OSError:
+        # No procfs (e.g. macOS): fall back to the lifetime high-water mark.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+class CallCounter:
+    """Counts API calls made through a boto3 client, by operation"""
+
+    def __init__(self, client):
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        client.meta.events.register("before-call.s3", self._on_call)
+
+    def _on_call(self, model, **kwargs):
+        with self._lock:
+            self.calls[model.name] = self.calls.get(model.name, 0) + 1
+
+    def reset(self) -> Dict[str, int]:
+        with self._lock:
+            calls, self.calls = self.calls, {}
+        return calls
+
+
+class Step:
+    """Measurements for one session count"""
+
+    def __init__(self, sessions: int):
+        self.sessions = sessions
+        self._lock = threading.Lock()
+        self.reruns: Dict[str, List[float]] = {}
+        self.scripts: List[float] = []
+        self.flows: List[float] = []
+        self.outcomes: Dict[str, int] = {}
+        self.errors: List[str] = []
+        self.peak_threads = 0
+        self.peak_rss_mb = 0.0
+        self._sampling = threading.Event()
+
+    def run(self, app, action: str):
+        requested = time.perf_counter()
+        with _apptest_lock:
+            started = time.perf_counter()
+            app.run()
+        finished = time.perf_counter()
+        with self._lock:
+            self.reruns.setdefault(action, []).append(finished - requested)
+            self.scripts.append(finished - started)
+        if app.exception:
+            raise RuntimeError(f"{action}: {app.exception[0].message}")
+
+    def finish(self, outcome: str, seconds: float, error: str = None):
+        with self._lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            self.flows.append(seconds)
+            if error and len(self.errors) < 10:
+                self.errors.append(error)
+
+    def sample(self):
+        self._sampling.set()
+
+        def loop():
+            while self._sampling.is_set():
+                self.peak_threads = max(self.peak_threads, threading.active_count())
+                self.peak_rss_mb = max(self.peak_rss_mb, current_rss_mb())
+                time.sleep(SAMPLE_INTERVAL_SECONDS)
+
+        threading.Thread(target=loop, name="loadtest-sampler", daemon=True).start()
+
+    def stop_sampling(self):
+        self._sampling.clear()
+
+
+def think(rng: random.Random, args):
+    time.sleep(rng.uniform(*args.think))
+
+
+def session_flow(index: int, step: Step, args, download_client):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(args.seed * 100003 + index)
+    time.sleep(rng.uniform(0, args.ramp))
+    started = time.perf_counter()
+    try:
+        app = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+        step.run(app, "landing")
+        think(rng, args)
+
+        app.selectbox(key="category_selector").set_value(rng.choice(list(PRODUCT_CATEGORIES)))
+        step.run(app, "browse")
+        think(rng, args)
+
+        rng.choice([button for button in app.button if button.label == "Select"]).click()
+        step.run(app, "select")
+        think(rng, args)
+
+        # A unique tweak per session, so the result cache cannot collapse the load.
+        prompt = app.text_area(key="prompt_input_catalog")
+        prompt.input(f"{prompt.value} Take {index}-{rng.randrange(10 ** 6)}.")
+        step.run(app, "edit_prompt")
+        app.button(key="generate_btn_catalog").click()
+        step.run(app, "generate")
+
+        job_id = app.session_state["job_id_catalog"]
+        deadline = time.time() + args.timeout
+        job = get_job_tracker(None).get(job_id)
+        while not job.done:
+            if time.time() > deadline:
+                raise TimeoutError(f"job {job_id} still {job.status} after {args.timeout}s")
+            time.sleep(args.poll)
+            step.run(app, "poll")
+        step.run(app, "result")
+        if job.status != "Completed":
+            step.finish("job_failed", time.perf_counter() - started)
+            return
+
+        links = [match for markdown in app.markdown for match in DOWNLOAD_LINK.findall(markdown.value)]
+        if not links:
+            raise RuntimeError("completed job rendered no download link")
+        # The browser fetches the file straight from S3, not through the app.
+        bucket, key = job.s3_uri.replace("s3://", "").split("/", 1)
+        download_client.get_object(Bucket=bucket, Key=f"{key}/output.mp4")["Body"].read()
+        step.finish("completed", time.perf_counter() - started)
+    except Exception as e:
+        step.finish("error", time.perf_counter() - started, f"session {index}: {type(e).__name__}: {e}")
+
+
+def _stage_totals() -> Dict[str, tuple]:
+    totals: Dict[str, list] = {}
+    for labels, (total, count) in STAGE_DURATION.snapshot().items():
+        stage = dict(labels)["stage"]
+        entry = totals.setdefault(stage, [0.0, 0])
+        entry[0] += total
+        entry[1] += count
+    return totals
+
+
+def run_step(sessions: int, args, fakes: List[FakeBedrockRuntime], s3_calls: CallCounter, download_client) -> dict:
+    step = Step(sessions)
+    for fake in fakes:
+        fake.calls.clear()
+    s3_calls.reset()
+    stages_before = _stage_totals()
+    started = time.perf_counter()
+    step.sample()
+    with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="loadtest-session") as pool:
+        for index in range(sessions):
+            pool.submit(session_flow, index, step, args, download_client)
+    step.stop_sampling()
+
+    stage_means = {}
+    for stage, (total, count) in _stage_totals().items():
+        previous_total, previous_count = stages_before.get(stage, (0.0, 0))
+        if count > previous_count:
+            stage_means[stage] = {"mean": (total - previous_total) / (count - previous_count),
+                                  "n": count - previous_count}
+    all_reruns = [sample for samples in step.reruns.values() for sample in samples]
+    bedrock_calls: Dict[str, int] = {}
+    for fake in fakes:
+        for operation, calls in fake.calls.items():
+            bedrock_calls[operation] = bedrock_calls.get(operation, 0) + calls
+    return {
+        "sessions": sessions,
+        "wall_seconds": time.perf_counter() - started,
+        "outcomes": step.outcomes,
+        "errors": step.errors,
+        "flow": summarize(step.flows),
+        "rerun": summarize(all_reruns) if all_reruns else None,
+        "rerun_by_action": {action: summarize(samples) for action, samples in step.reruns.items()},
+        "script": summarize(step.scripts) if step.scripts else None,
+        "stage_means": stage_means,
+        # Includes one driver thread per simulated session.
+        "peak_threads": step.peak_threads,
+        "peak_rss_mb": round(step.peak_rss_mb, 1),
+        "bedrock_calls": bedrock_calls,
+        "jobs_by_region": {
+            endpoint["region"]: fake.calls.get("start_async_invoke", 0)
+            for endpoint, fake in zip(GENERATION_ENDPOINTS, fakes)
+        },
+        "s3_calls": s3_calls.reset(),
+    }
+
+
+def print_step(result: dict):
+    rerun = result["rerun"] or {"median": 0, "p95": 0, "p99": 0}
+    print(f"{result['sessions']:>5} sessions  "
+          f"rerun p50 {rerun['median'] * 1000:7.0f}ms  p95 {rerun['p95'] * 1000:7.0f}ms  "
+          f"p99 {rerun['p99'] * 1000:7.0f}ms  script p50 {(result['script'] or rerun)['median'] * 1000:6.0f}ms  threads {result['peak_threads']:>4}  "
+          f"rss {result['peak_rss_mb']:7.1f}MB  bedrock {sum(result['bedrock_calls'].values()):>5}  "
+          f"s3 {sum(result['s3_calls'].values()):>5}  {result['outcomes']}")
+    slowest = sorted(result["stage_means"].items(), key=lambda item: item[1]["mean"], reverse=True)[:3]
+    print("       slowest stages: " + ", ".join(f"{stage} {value['mean'] * 1000:.0f}ms" for stage, value in slowest))
+    for error in result["errors"][:3]:
+        print(f"       {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive many concurrent AppTest sessions through main.py.")
+    parser.add_argument("--sessions", default="10,50,100",
+                        help="Comma-separated concurrent session counts, run in order")
+    parser.add_argument("--ramp", type=float, default=5.0, help="Sessions start spread over this many seconds")
+    parser.add_argument("--think", type=float, nargs=2, default=(0.5, 2.0), metavar=("MIN", "MAX"),
+                        help="Pause between user actions, in seconds")
+    parser.add_argument("--poll", type=float, default=2.0, help="Seconds between reruns while a job runs")
+    parser.add_argument("--job-duration", type=float, default=10.0, help="Simulated seconds per generation job")
+    parser.add_argument("--start-latency", type=float, default=0.2, help="Simulated start_async_invoke latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--regions", type=int, default=1, help="Fake Bedrock regions to route jobs across")
+    parser.add_argument("--completion-events", action="store_true",
+                        help="Detect completion from S3 events on SQS instead of polling")
+    parser.add_argument("--max-concurrent", type=int, default=None,
+                        help="Concurrent jobs per region (default: largest session count)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-rerun and per-job timeout")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args(argv)
+    steps = [int(count) for count in args.sessions.split(",")]
+
+    fakes = [
+        FakeBedrockRuntime(duration=args.job_duration, start_latency=args.start_latency,
+                           failure_rate=args.failure_rate, throttle_rate=args.throttle_rate, seed=args.seed + i)
+        for i in range(args.regions)
+    ]
+    aws_manager = start_offline_backend(fakes, max_concurrent=args.max_concurrent or max(steps),
+                                        completion_events=args.completion_events)
+    s3_calls = CallCounter(aws_manager.s3_client)
+    download_client = boto3.client("s3", region_name=AWS_REGION)
+
+    results = []
+    for sessions in steps:
+        result = run_step(sessions, args, fakes, s3_calls, download_client)
+        print_step(result)
+        results.append(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "steps": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Offline benchmark suite.
+
+Runs against an in-process S3 (moto) and a fake ``bedrock-runtime``, so no
+network or AWS account is needed::
+
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.run --output baseline.json
+    python -m benchmarks.run --compare baseline.json
+
+Inputs are synthetic and seeded, so two runs on the same machine measure
+the same work. ``--compare`` exits non-zero when a median regresses by more
+than ``--tolerance``.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+# Sets the environment the app modules read at import time, so it goes first.
+from benchmarks.backend import APP_PATH, LISTING_PREFIX, start_offline_backend
+
+import PIL
+
+import catalog
+import image_pipeline
+import presign
+from benchmarks.fakes import FakeBedrockRuntime, synthetic_image
+from config import CATALOG_BUCKET
+from generation import submit_video_job
+from metrics import STAGE_DURATION
+
+SESSIONS = 4
+# Differences below this are noise whatever the ratio.
+NOISE_FLOOR_SECONDS = 0.002
+
+PREPARE_CASES = {
+    "rgb_1280x720_png": ((1280, 720), "RGB", "PNG"),
+    "rgb_640x480_jpeg": ((640, 480), "RGB", "JPEG"),
+    "rgba_2048x2048_png": ((2048, 2048), "RGBA", "PNG"),
+    "palette_1600x1200_png": ((1600, 1200), "P", "PNG"),
+    "jpeg_4000x3000": ((4000, 3000), "RGB", "JPEG"),
+    "jpeg_8000x6000": ((8000, 6000), "RGB", "JPEG"),
+}
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+def summarize(samples: List[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "median": statistics.median(ordered),
+        "p95": _percentile(ordered, 0.95),
+        "p99": _percentile(ordered, 0.99),
+        "min": ordered[0],
+        "max": ordered[-1],
+    }
+
+
+def measure(fn: Callable[[], object], repeat: int, setup: Optional[Callable[[], None]] = None) -> dict:
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def reset_catalog_caches():
+    with catalog._indexes_lock:
+        catalog._indexes.clear()
+    with presign._cache_lock:
+        presign._cache = None
+
+
+def bench_catalog(aws_manager, repeat: int) -> Dict[str, dict]:
+    list_all = lambda: aws_manager.get_product_images_from_s3(CATALOG_BUCKET, LISTING_PREFIX)
+    first_page = lambda: aws_manager.get_product_page(CATALOG_BUCKET, LISTING_PREFIX)
+    results = {
+        "catalog.list_and_presign_all.cold": measure(list_all, repeat, setup=reset_catalog_caches),
+        "catalog.first_page.cold": measure(first_page, repeat, setup=reset_catalog_caches),
+    }
+    list_all()
+    results["catalog.list_and_presign_all.warm"] = measure(list_all, repeat)
+    results["catalog.first_page.warm"] = measure(first_page, repeat)
+    return results
+
+
+def bench_prepare_image(repeat: int) -> Dict[str, dict]:
+    results = {}
+    for name, (size, mode, fmt) in PREPARE_CASES.items():
+        image_bytes = synthetic_image(size, mode, fmt)
+        results[f"prepare_image.{name}.cold"] = measure(
+            lambda: image_pipeline.prepare_image(image_bytes), repeat, setup=image_pipeline._prepared.clear
+        )
+        results[f"prepare_image.{name}.warm"] = measure(lambda: image_pipeline.prepare_image(image_bytes), repeat)
+    return results
+
+
+def bench_generation(aws_manager, fake: FakeBedrockRuntime, job_count: int, timeout: float) -> Dict[str, dict]:
+    """Overhead the app adds around Bedrock: submission, admission and completion detection"""
+    fake.calls.clear()
+    submit_latency, enqueued_at, submitted = [], [], []
+    for i in range(job_count):
+        enqueued_at.append(time.time())
+        started = time.perf_counter()
+        submitted.append(submit_video_job(aws_manager, f"Benchmark prompt {i}", session_id=f"bench-{i % SESSIONS}"))
+        submit_latency.append(time.perf_counter() - started)
+
+    deadline = time.time() + timeout
+    while not all(job.done for job in submitted):
+        if time.time() > deadline:
+            raise RuntimeError(f"{sum(not job.done for job in submitted)} jobs still running after {timeout}s")
+        time.sleep(0.05)
+
+    # Everything beyond the simulated model time is ours.
+    floor = fake.duration + fake.start_latency
+    overhead = [job.completed_at - queued - floor for job, queued in zip(submitted, enqueued_at)]
+    control_plane_calls = sum(fake.calls.values())
+    return {
+        "generation.submit": summarize(submit_latency),
+        "generation.overhead": summarize(overhead),
+        "generation.control_plane_calls_per_job": {"median": control_plane_calls / job_count, "n": job_count},
+        "generation.failed_jobs": {"median": float(sum(job.status == "Failed" for job in submitted)), "n": job_count},
+    }
+
+
+def _render_tab_totals() -> Dict[str, tuple]:
+    return {
+        dict(labels)["tab"]: totals
+        for labels, totals in STAGE_DURATION.snapshot().items()
+        if dict(labels).get("stage") == "render_tab"
+    }
+
+
+def bench_reruns(repeat: int) -> Dict[str, dict]:
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP_PATH, default_timeout=120)
+    results = {"rerun.first_load": measure(app.run, 1)}
+
+    def scenario(name: str):
+        before = _render_tab_totals()
+        results[f"rerun.{name}.script"] = measure(app.run, repeat)
+        # Per-tab times come from the app's render_tab histogram, which only
+        # keeps totals, so the mean stands in for the median.
+        for tab, (total, count) in _render_tab_totals().items():
+            previous_total, previous_count = before.get(tab, (0.0, 0))
+            if count > previous_count:
+                mean = (total - previous_total) / (count - previous_count)
+                results[f"rerun.{name}.tab.{tab}"] = {"median": mean, "n": count - previous_count}
+        if app.exception:
+            raise RuntimeError(f"App raised during {name} reruns: {app.exception}")
+
+    scenario("idle")
+    select = next(button for button in app.button if button.label == "Select")
+    select.click().run()
+    scenario("selected")
+    return results
+
+
+def run_benchmarks(args) -> dict:
+    fake = FakeBedrockRuntime(duration=args.job_duration, start_latency=args.start_latency,
+                              failure_rate=args.failure_rate, throttle_rate=args.throttle_rate, seed=args.seed)
+    aws_manager = start_offline_backend([fake], max_concurrent=args.jobs, listing_objects=args.objects)
+    results: Dict[str, dict] = {}
+    if "prepare" in args.only:
+        results.update(bench_prepare_image(args.repeat))
+    if "catalog" in args.only:
+        results.update(bench_catalog(aws_manager, args.repeat))
+    if "generation" in args.only:
+        results.update(bench_generation(aws_manager, fake, args.jobs, timeout=args.job_duration * 20 + 60))
+    if "rerun" in args.only:
+        results.update(bench_reruns(args.repeat))
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "pillow": PIL.__version__,
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> List[str]:
+    """Print a comparison table and return the names that regressed"""
+    regressions = []
+    print(f"{'benchmark':60} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:60} {'-':>10} {result['median']:>10.4f} {'new':>8}")
+            continue
+        old, new = before["median"], result["median"]
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        if change > tolerance and new - old > NOISE_FLOOR_SECONDS:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:60} {old:>10.4f} {new:>10.4f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks with moto S3 and a fake Bedrock runtime.")
+    parser.add_argument("--only", default="prepare,catalog,generation,rerun",
+                        help="Comma-separated subset of prepare, catalog, generation, rerun")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--objects", type=int, default=10000, help="Objects under the listing prefix")
+    parser.add_argument("--jobs", type=int, default=50, help="Generation jobs to push through the flow")
+    parser.add_argument("--job-duration", type=float, default=2.0, help="Simulated seconds per generation job")
+    parser.add_argument("--start-latency", type=float, default=0.05, help="Simulated start_async_invoke latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed median slowdown before failing")
+    args = parser.parse_args(argv)
+    args.only = [name.strip() for name in args.only.split(",")]
+
+    report = run_benchmarks(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+    elif not args.output:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
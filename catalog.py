@@ -0,0 +1,98 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from config import PREPARED_CATALOG_PREFIX
+from metrics import count, timed
+
+CATALOG_TTL_SECONDS = 60
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def product_name_from_key(key: str) -> str:
+    return key.split('/')[-1].split('.')[0].replace('_', ' ').title()
+
+
+def prepared_key(key: str, etag: str) -> str:
+    """Where the model-ready JPEG for this version of ``key`` is precomputed"""
+    version = etag.strip('"')
+    return f"{PREPARED_CATALOG_PREFIX}{key}/{version}.jpg"
+
+
+def load_prepared_image(s3_client, bucket: str, key: str, etag: str) -> Optional[bytes]:
+    """The precomputed model-ready JPEG for this version of ``key``, or None if it has not been built"""
+    try:
+        with timed("s3_load_prepared_image"):
+            body = s3_client.get_object(Bucket=bucket, Key=prepared_key(key, etag))['Body'].read()
+    except (ClientError, BotoCoreError):
+        # Missing, or S3 unreachable: callers fall back to preparing the original.
+        count("prepared_image", result="miss")
+        return None
+    count("prepared_image", result="hit")
+    return body
+
+
+class CatalogIndex:
+    """Shared listing of the product images under one (bucket, prefix).
+
+    The listing is reused for ``ttl`` seconds. After that the prefix is
+    listed again, but products are only rebuilt when the set of keys and
+    ETags or the latest ``LastModified`` has changed.
+    """
+
+    def __init__(self, bucket: str, prefix: str, ttl: float = CATALOG_TTL_SECONDS):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.ttl = ttl
+        # Held while listing so concurrent sessions share one S3 round trip.
+        self._lock = threading.Lock()
+        self._products: Optional[List[dict]] = None
+        self._fingerprint = None
+        self._refreshed_at = 0.0
+
+    def products(self, s3_client) -> List[dict]:
+        with self._lock:
+            now = time.time()
+            if self._products is None or now - self._refreshed_at >= self.ttl:
+                objects = self._list_objects(s3_client)
+                fingerprint = (
+                    max((obj['LastModified'] for obj in objects), default=None),
+                    tuple((obj['Key'], obj['ETag']) for obj in objects)
+                )
+                if fingerprint != self._fingerprint:
+                    self._products = [
+                        {'name': product_name_from_key(obj['Key']), 'key': obj['Key'], 'etag': obj['ETag']}
+                        for obj in objects
+                    ]
+                    self._fingerprint = fingerprint
+                self._refreshed_at = now
+            return self._products
+
+    def invalidate(self):
+        with self._lock:
+            self._refreshed_at = 0.0
+
+    def _list_objects(self, s3_client) -> List[dict]:
+        paginator = s3_client.get_paginator('list_objects_v2')
+        objects = []
+        with timed("s3_list"):
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+                for obj in page.get('Contents', []):
+                    if obj['Key'].lower().endswith(IMAGE_EXTENSIONS):
+                        objects.append(obj)
+        return objects
+
+
+_indexes: Dict[Tuple[str, str], CatalogIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_catalog_index(bucket: str, prefix: str) -> CatalogIndex:
+    """Return the process-wide index for ``(bucket, prefix)``"""
+    with _indexes_lock:
+        index = _indexes.get((bucket, prefix))
+        if index is None:
+            index = _indexes[(bucket, prefix)] = CatalogIndex(bucket, prefix)
+        return index
@@ -0,0 +1,141 @@
+"""Job completion from S3 events instead of status polling.
+
+Each generation endpoint with a ``completion_queue_url`` has its output
+bucket send ``s3:ObjectCreated:*`` notifications for ``OUTPUT_S3_PREFIX``
+(suffix ``output.mp4``) to that SQS queue, directly or through an SNS
+topic. A listener thread long-polls the queue and settles the job whose
+video just landed as soon as the event arrives. While the queue is
+reachable the tracker polls that region only every
+``EVENT_FALLBACK_POLL_SECONDS``, to catch failures (which write no video)
+and lost events; if it becomes unreachable the region goes back to normal
+polling until it recovers.
+
+Every replica needs its own queue (fan out through SNS), since a message
+consumed by one replica is never seen by the others.
+"""
+import json
+import logging
+import threading
+import time
+import urllib.parse
+from typing import List, Optional
+
+from config import GENERATION_ENDPOINTS
+from jobs import EVENT_FALLBACK_POLL_SECONDS, OUTPUT_FILE_NAME, JobTracker
+
+RECEIVE_WAIT_SECONDS = 20
+RECEIVE_BATCH_SIZE = 10
+ERROR_BACKOFF_SECONDS = 5
+
+logger = logging.getLogger(__name__)
+
+
+def output_objects(body: str) -> List[tuple]:
+    """``(bucket, key)`` of every ``output.mp4`` created in an S3 event message (SNS-wrapped or not)"""
+    event = json.loads(body)
+    if event.get("Type") == "Notification":
+        event = json.loads(event["Message"])
+    objects = []
+    # s3:TestEvent, sent when notifications are configured, has no records.
+    for record in event.get("Records", []):
+        if not record.get("eventName", "").startswith("ObjectCreated"):
+            continue
+        key = urllib.parse.unquote_plus(record["s3"]["object"]["key"])
+        if key.endswith("/" + OUTPUT_FILE_NAME):
+            objects.append((record["s3"]["bucket"]["name"], key))
+    return objects
+
+
+class CompletionListener:
+    """Long-polls one region's completion queue and feeds its events to the tracker"""
+
+    def __init__(self, tracker: JobTracker, sqs_client, queue_url: str, region: Optional[str],
+                 fallback_interval: float = EVENT_FALLBACK_POLL_SECONDS):
+        self.tracker = tracker
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+        self.region = region
+        self.fallback_interval = fallback_interval
+        self._healthy = False
+        self._thread = threading.Thread(target=self._run, name=f"completion-listener-{region}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _set_healthy(self, healthy: bool):
+        if healthy == self._healthy:
+            return
+        self._healthy = healthy
+        if healthy:
+            self.tracker.use_completion_events(self.region, self.fallback_interval)
+        else:
+            self.tracker.stop_completion_events(self.region)
+
+    def handle(self, body: str):
+        try:
+            objects = output_objects(body)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring malformed completion event: %s", e)
+            return
+        for bucket, key in objects:
+            self.tracker.complete_output(bucket, key)
+
+    def _run(self):
+        try:
+            # Switch to events right away rather than after the first long poll returns.
+            self.sqs_client.get_queue_attributes(QueueUrl=self.queue_url, AttributeNames=["QueueArn"])
+            self._set_healthy(True)
+        except Exception as e:
+            logger.warning("Completion queue unavailable for %s, polling instead: %s", self.region, e)
+        while True:
+            try:
+                response = self.sqs_client.receive_message(
+                    QueueUrl=self.queue_url,
+                    MaxNumberOfMessages=RECEIVE_BATCH_SIZE,
+                    WaitTimeSeconds=RECEIVE_WAIT_SECONDS
+                )
+            except Exception as e:
+                logger.warning("Completion queue unavailable for %s, polling instead: %s", self.region, e)
+                self._set_healthy(False)
+                time.sleep(ERROR_BACKOFF_SECONDS)
+                continue
+            self._set_healthy(True)
+            messages = response.get("Messages", [])
+            for message in messages:
+                self.handle(message["Body"])
+            if messages:
+                try:
+                    # Events for jobs this process does not track are dropped
+                    # too; the tracker that owns them polls as a fallback.
+                    self.sqs_client.delete_message_batch(
+                        QueueUrl=self.queue_url,
+                        Entries=[{"Id": str(i), "ReceiptHandle": message["ReceiptHandle"]}
+                                 for i, message in enumerate(messages)]
+                    )
+                except Exception as e:
+                    # Redelivered events are harmless: settled jobs ignore them.
+                    logger.warning("Error deleting completion events: %s", e)
+
+
+_listeners: List[CompletionListener] = []
+_started = False
+_start_lock = threading.Lock()
+
+
+def start_completion_listeners(tracker: JobTracker) -> List[CompletionListener]:
+    """Listen on every endpoint's ``completion_queue_url`` (once per process)"""
+    global _started
+    with _start_lock:
+        if not _started:
+            _started = True
+            import boto3
+            from aws_utils import CLIENT_CONFIG
+
+            for endpoint in GENERATION_ENDPOINTS:
+                if not endpoint.get("completion_queue_url"):
+                    continue
+                sqs_client = boto3.session.Session(region_name=endpoint["region"]).client("sqs", config=CLIENT_CONFIG)
+                listener = CompletionListener(tracker, sqs_client, endpoint["completion_queue_url"], endpoint["region"])
+                listener.start()
+                _listeners.append(listener)
+        return list(_listeners)
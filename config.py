@@ -0,0 +1,36 @@
+import json
+import os
+
+# AWS Configuration
+AWS_REGION = "us-east-1"
+OUTPUT_S3_BUCKET = "aws-summit-nova-reel"
+OUTPUT_S3_PREFIX = "nova-reel-output/"
+CATALOG_BUCKET = "aws-summit-product-catalog"
+# Model-ready copies of catalog images (see precompute.py); must not sit
+# under any PRODUCT_CATEGORIES prefix.
+PREPARED_CATALOG_PREFIX = "prepared/"
+MODEL_ID = "amazon.nova-reel-v1:1"
+
+# Regions generation jobs are spread across, each writing to an output
+# bucket in that region. "max_concurrent", "rate" and "burst" override the
+# submission queue defaults per region; "completion_queue_url" is an SQS
+# queue receiving the bucket's ObjectCreated events (see completions.py).
+# For example:
+# GENERATION_ENDPOINTS='[{"region": "us-east-1", "bucket": "aws-summit-nova-reel", "max_concurrent": 10},
+#                        {"region": "us-west-2", "bucket": "aws-summit-nova-reel-usw2", "max_concurrent": 10}]'
+GENERATION_ENDPOINTS = json.loads(os.environ.get("GENERATION_ENDPOINTS", "null")) or [
+    {"region": AWS_REGION, "bucket": OUTPUT_S3_BUCKET, "completion_queue_url": os.environ.get("COMPLETION_QUEUE_URL")}
+]
+
+# Product Categories
+PRODUCT_CATEGORIES = {
+    "Food & Beverages": "products/food/",
+    "Nature": "products/nature/",
+    "Home & Living": "products/home-living/"
+}
+
+CREATIVE_PROMPTS = [
+    "Cinematic dolly shot with beautiful lighting and focus transitions",
+    "360-degree pan around the product with particle effects",
+    "Modern tech-style presentation with floating elements"
+]
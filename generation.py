@@ -0,0 +1,70 @@
+from config import MODEL_ID, OUTPUT_S3_PREFIX
+from admission import Region, get_submission_queue
+from job_store import get_job_store, restore_job
+from jobs import Job, get_job_tracker
+from metrics import timed
+from result_cache import RESULT_CACHE_TTL_SECONDS, get_result_cache, request_key
+
+
+def default_prompt(product_name=None):
+    if product_name:
+        return f"Create a cinematic video showcasing {product_name} with dynamic camera movements and professional lighting."
+    return "Create a cinematic video with dynamic camera movements and professional lighting."
+
+
+def build_model_input(prompt, base64_image=None):
+    text_to_video_params = {"text": prompt}
+    if base64_image:
+        text_to_video_params["images"] = [{"format": "jpeg", "source": {"bytes": base64_image}}]
+    return {
+        "taskType": "TEXT_VIDEO",
+        "textToVideoParams": text_to_video_params,
+        "videoGenerationConfig": {
+            "durationSeconds": 6,
+            "fps": 24,
+            "dimension": "1280x720"
+        }
+    }
+
+
+def submit_video_job(aws_manager, prompt, base64_image=None, session_id="default",
+                     user_id=None, panel=None) -> Job:
+    """Queue a Nova Reel invocation, or reuse an identical one, and return its tracked job
+
+    ``session_id`` is the fairness key for the submission queue. With
+    ``user_id`` the job is added to that user's durable history, tagged
+    with the UI ``panel`` it was started from.
+    """
+    model_input = build_model_input(prompt, base64_image)
+
+    def start(region: Region):
+        # The output goes to the bucket in the region the queue routed this job to.
+        output_config = {
+            "s3OutputDataConfig": {
+                "s3Uri": f"s3://{region.bucket}/{OUTPUT_S3_PREFIX}"
+            }
+        }
+        with timed("bedrock_start", region=region.name or "default"):
+            response = region.submit_client.start_async_invoke(
+                modelId=MODEL_ID,
+                modelInput=model_input,
+                outputDataConfig=output_config
+            )
+        return response["invocationArn"]
+
+    tracker = get_job_tracker(aws_manager.bedrock_runtime)
+    store = get_job_store(tracker)
+    key = request_key(MODEL_ID, model_input)
+
+    def submit():
+        # The result cache starts empty after a restart; the store does not.
+        reusable = store.find_reusable(key, RESULT_CACHE_TTL_SECONDS)
+        if reusable is not None:
+            return restore_job(store, tracker, reusable.job_id)
+        return get_submission_queue(tracker).enqueue(session_id, start)
+
+    # Identical requests reuse a finished video or attach to the running job.
+    job = get_result_cache().get_or_submit(key, submit)
+    if user_id:
+        store.record(job, user_id, prompt, panel, key)
+    return job
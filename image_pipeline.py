@@ -0,0 +1,209 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from PIL import Image
+
+from metrics import count, timed
+
+MODEL_IMAGE_SIZE = (1280, 720)
+PREVIEW_MAX_SIZE = (800, 800)
+MAX_PREPARED_IMAGES = 64
+
+# Budgets for user uploads, checked from the header before any decoding.
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 25 * 2 ** 20))
+UPLOAD_FORMATS = ("JPEG", "PNG")
+# JPEGs decode at a reduced DCT scale, so a large one costs little memory;
+# PNGs are always decoded at full size first.
+MAX_UPLOAD_PIXELS = {"JPEG": 64_000_000, "PNG": 24_000_000}
+MAX_CONCURRENT_INGESTS = int(os.environ.get("MAX_CONCURRENT_INGESTS", 2))
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    """Everything the app derives from one source image"""
+    digest: str
+    source_size: Tuple[int, int]
+    resized: bool
+    converted: bool
+    preview: bytes
+    model_payload: str
+
+
+@dataclass(frozen=True)
+class IngestedImage:
+    """A validated upload, normalized to just cover the model size"""
+    image_bytes: bytes
+    preview: bytes
+    source_size: Tuple[int, int]
+
+
+def content_hash(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def _decode_bounded(image_bytes: bytes, size=MODEL_IMAGE_SIZE) -> Image.Image:
+    """Decode at the smallest scale that still covers ``size``"""
+    return _load_bounded(Image.open(io.BytesIO(image_bytes)), size)
+
+
+def _source_format(img: Image.Image) -> str:
+    # Phones save multi-picture JPEGs, which Pillow opens as "MPO"; the first
+    # picture is an ordinary JPEG and decodes (and drafts) as one.
+    return "JPEG" if img.format == "MPO" else img.format
+
+
+def _reducible(img: Image.Image) -> Image.Image:
+    """``img`` in a mode ``reduce()`` accepts; palette, 1-bit and 16-bit images are widened"""
+    if img.mode in ("P", "PA"):
+        # Keeps any transparency for _flatten to composite.
+        return img.convert("RGBA" if img.mode == "PA" or "transparency" in img.info else "RGB")
+    if img.mode == "1":
+        return img.convert("L")
+    if img.mode.startswith("I;16"):
+        return img.convert("I")
+    return img
+
+
+def _load_bounded(img: Image.Image, size=MODEL_IMAGE_SIZE) -> Image.Image:
+    if _source_format(img) == "JPEG":
+        # DCT scaling happens inside the decoder, so skipped pixels are never materialized.
+        img.draft("RGB", size)
+    else:
+        factor = min(img.width // size[0], img.height // size[1])
+        if factor >= 2:
+            img = _reducible(img).reduce(factor)
+    img.load()
+    return img
+
+
+def _flatten(img: Image.Image) -> Tuple[Image.Image, bool]:
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'RGBA':
+            background.paste(img, mask=img.split()[3])
+        else:
+            background.paste(img, mask=img.convert('RGBA').split()[3])
+        return background, True
+    elif img.mode != 'RGB':
+        return img.convert('RGB'), False
+    return img, False
+
+
+def _encode_jpeg(img: Image.Image, quality: int) -> bytes:
+    out = io.BytesIO()
+    img.save(out, format='JPEG', quality=quality)
+    return out.getvalue()
+
+
+def model_ready_jpeg(image_bytes: bytes) -> bytes:
+    """The exact JPEG ``prepare_image`` would send to the model for this image"""
+    img, _ = _flatten(_decode_bounded(image_bytes))
+    if img.size != MODEL_IMAGE_SIZE:
+        img = img.resize(MODEL_IMAGE_SIZE, Image.LANCZOS)
+    return _encode_jpeg(img, quality=95)
+
+
+_prepared: "OrderedDict[str, PreparedImage]" = OrderedDict()
+_prepared_lock = threading.Lock()
+
+
+def prepare_image(image_bytes: bytes, digest: Optional[str] = None) -> PreparedImage:
+    """Decode an image once and build its preview and model payload.
+
+    Results are memoized by content hash, so reruns and repeat submissions
+    of the same image do no image work at all.
+    """
+    digest = digest or content_hash(image_bytes)
+    with _prepared_lock:
+        prepared = _prepared.get(digest)
+        if prepared is not None:
+            _prepared.move_to_end(digest)
+    if prepared is not None:
+        count("prepared_image_cache", result="hit")
+        return prepared
+    count("prepared_image_cache", result="miss")
+
+    with timed("prepare_image"):
+        source = Image.open(io.BytesIO(image_bytes))
+        source_size = source.size
+        # Precomputed catalog images are already exactly what the model takes.
+        model_ready = source.format == "JPEG" and source.mode == "RGB" and source_size == MODEL_IMAGE_SIZE
+        img, converted = _flatten(_load_bounded(source))
+
+        preview = img.copy()
+        preview.thumbnail(PREVIEW_MAX_SIZE, Image.LANCZOS)
+
+        resized = source_size != MODEL_IMAGE_SIZE
+        if img.size != MODEL_IMAGE_SIZE:
+            img = img.resize(MODEL_IMAGE_SIZE, Image.LANCZOS)
+
+        prepared = PreparedImage(
+            digest=digest,
+            source_size=source_size,
+            resized=resized,
+            converted=converted,
+            preview=_encode_jpeg(preview, quality=85),
+            model_payload=base64.b64encode(image_bytes if model_ready else _encode_jpeg(img, quality=95)).decode('utf-8')
+        )
+    with _prepared_lock:
+        _prepared[digest] = prepared
+        while len(_prepared) > MAX_PREPARED_IMAGES:
+            _prepared.popitem(last=False)
+    return prepared
+
+
+
+_ingest_slots = threading.BoundedSemaphore(MAX_CONCURRENT_INGESTS)
+
+
+def _reject(reason: str, message: str):
+    count("upload_rejected", reason=reason)
+    raise ValueError(message)
+
+
+def ingest_upload(file, size: int) -> IngestedImage:
+    """Validate an untrusted upload and decode it within budget.
+
+    Byte size, format and dimensions are checked before any pixel is
+    decoded; the image is then decoded straight to a scale that covers the
+    model size. Only the normalized JPEG and a preview are returned, never
+    the original. Raises ``ValueError`` with a user-facing message when
+    the upload is rejected.
+    """
+    if size > MAX_UPLOAD_BYTES:
+        _reject("bytes", f"Image is {size / 2 ** 20:.1f} MB; the limit is {MAX_UPLOAD_BYTES / 2 ** 20:.0f} MB.")
+    try:
+        # Reads only the header.
+        img = Image.open(file, formats=UPLOAD_FORMATS)
+    except (OSError, Image.DecompressionBombError):
+        _reject("format", "This file is not a valid PNG or JPEG image.")
+    fmt = _source_format(img)
+    width, height = img.size
+    if width * height > MAX_UPLOAD_PIXELS[fmt]:
+        _reject("pixels", f"Image is {width}x{height} ({width * height / 1e6:.0f} MP); "
+                          f"{fmt} uploads are limited to {MAX_UPLOAD_PIXELS[fmt] / 1e6:.0f} MP.")
+
+    # Bounds how many full-size decodes can be in memory at once.
+    with _ingest_slots, timed("ingest_upload", format=fmt):
+        try:
+            img, _ = _flatten(_load_bounded(img))
+        except (OSError, SyntaxError):
+            # Raised by the decoders for truncated or corrupt data.
+            _reject("decode", "This image is damaged or incomplete. Please try another file.")
+        # Just cover the model size so the final resize loses no detail.
+        scale = max(MODEL_IMAGE_SIZE[0] / img.width, MODEL_IMAGE_SIZE[1] / img.height)
+        if scale < 1:
+            img = img.resize((round(img.width * scale), round(img.height * scale)), Image.LANCZOS)
+        preview = img.copy()
+        preview.thumbnail(PREVIEW_MAX_SIZE, Image.LANCZOS)
+        return IngestedImage(
+            image_bytes=_encode_jpeg(img, quality=95),
+            preview=_encode_jpeg(preview, quality=85),
+            source_size=(width, height)
+        )
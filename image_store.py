@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from image_pipeline import content_hash
+
+IMAGE_STORE_MAX_BYTES = int(os.environ.get("IMAGE_STORE_MAX_BYTES", 256 * 1024 * 1024))
+# A session that has not touched an image for this long no longer pins it;
+# Streamlit gives us no reliable hook for sessions that simply go away.
+LEASE_TTL_SECONDS = int(os.environ.get("IMAGE_LEASE_TTL_SECONDS", 2 * 3600))
+
+
+@dataclass
+class _Entry:
+    data: bytes
+    leases: Dict[str, float] = field(default_factory=dict)
+
+    def live_leases(self, now: float) -> int:
+        return sum(1 for touched in self.leases.values() if now - touched < LEASE_TTL_SECONDS)
+
+
+class ImageStore:
+    """Process-wide, content-addressed store for selected source images.
+
+    Sessions keep only the digest. Each image is held once however many
+    sessions selected it, is pinned by per-session leases, and unpinned
+    images are evicted least-recently-used once the store passes
+    ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes: int = IMAGE_STORE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._size = 0
+
+    def put(self, image_bytes: bytes, session_id: str) -> str:
+        """Store ``image_bytes`` (once) under a lease for ``session_id`` and return its digest"""
+        digest = content_hash(image_bytes)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                entry = self._entries[digest] = _Entry(image_bytes)
+                self._size += len(image_bytes)
+            entry.leases[session_id] = time.time()
+            self._entries.move_to_end(digest)
+            self._evict()
+        return digest
+
+    def get(self, digest: str, session_id: Optional[str] = None) -> Optional[bytes]:
+        """Return the stored bytes, renewing ``session_id``'s lease; None if evicted"""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if session_id is not None:
+                entry.leases[session_id] = time.time()
+            self._entries.move_to_end(digest)
+            return entry.data
+
+    def release(self, digest: str, session_id: str):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                entry.leases.pop(session_id, None)
+                self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"images": len(self._entries), "bytes": self._size}
+
+    def _evict(self):
+        if self._size <= self.max_bytes:
+            return
+        now = time.time()
+        for digest in list(self._entries):
+            if self._size <= self.max_bytes:
+                break
+            entry = self._entries[digest]
+            if entry.live_leases(now) == 0:
+                del self._entries[digest]
+                self._size -= len(entry.data)
+
+
+_store: Optional[ImageStore] = None
+_store_lock = threading.Lock()
+
+
+def get_image_store() -> ImageStore:
+    """Return the process-wide image store, creating it on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ImageStore()
+        return _store
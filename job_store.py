@@ -0,0 +1,206 @@
+"""Durable record of generation jobs, SQLite by default.
+
+Every job a user starts is written with its user id, panel, request key,
+invocation ARN, status and timestamps, and is updated as the tracker
+starts and settles it. Sessions that reconnect (reload, new tab, process
+restart) reattach to their jobs from here instead of resubmitting, and
+the history view reads from here without calling Bedrock. Replicas on one
+host can share the file (``JOB_STORE_PATH``); across hosts it has to live
+on storage that supports SQLite locking.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+from jobs import QUEUED, Job, JobTracker
+
+JOB_STORE_PATH = os.environ.get(
+    "JOB_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.sqlite3")
+)
+# Queued jobs live only in the memory of the process that queued them.
+STALE_QUEUED_SECONDS = 900
+INTERRUPTED_MESSAGE = "Interrupted before it was submitted. Please generate again."
+REATTACH_WINDOW_SECONDS = 3600
+BUSY_TIMEOUT_SECONDS = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    panel TEXT,
+    prompt TEXT,
+    request_key TEXT,
+    invocation_arn TEXT,
+    region TEXT,
+    owner TEXT,
+    status TEXT NOT NULL,
+    s3_uri TEXT,
+    failure_message TEXT,
+    created_at REAL NOT NULL,
+    submitted_at REAL,
+    completed_at REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (user_id, job_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_by_user ON jobs (user_id, created_at);
+CREATE INDEX IF NOT EXISTS jobs_by_job ON jobs (job_id);
+CREATE INDEX IF NOT EXISTS jobs_by_arn ON jobs (invocation_arn);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, updated_at);
+CREATE INDEX IF NOT EXISTS jobs_by_request ON jobs (request_key, status, completed_at);
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def _job_from_row(row: sqlite3.Row) -> Job:
+    return Job(
+        job_id=row["job_id"],
+        invocation_arn=row["invocation_arn"],
+        status=row["status"],
+        s3_uri=row["s3_uri"],
+        failure_message=row["failure_message"],
+        submitted_at=row["submitted_at"] or row["created_at"],
+        completed_at=row["completed_at"],
+        region=row["region"]
+    )
+
+
+class JobStore:
+    """SQLite-backed job history shared by sessions, restarts and replicas"""
+
+    def __init__(self, path: str = JOB_STORE_PATH):
+        self.path = path
+        # Marks rows this store's process queued; only it can submit them.
+        self.owner = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        # WAL lets replicas read while another one writes.
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "region" not in columns:
+            # Stores created before jobs could run outside the default region.
+            self._db.execute("ALTER TABLE jobs ADD COLUMN region TEXT")
+        if "owner" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+
+    def record(self, job: Job, user_id: str, prompt: str, panel: Optional[str] = None,
+               request_key: Optional[str] = None):
+        """Add ``job`` to ``user_id``'s history (a no-op if it is already there)"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, user_id, panel, prompt, request_key, owner, status,"
+                " created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.job_id, user_id, panel, prompt, request_key, self.owner, job.status, now, now)
+            )
+        # The job may have moved on before the row existed.
+        self.update(job)
+
+    def update(self, job: Job):
+        """Copy the job's current state to every history row that references it"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET invocation_arn = ?, region = ?, status = ?, s3_uri = ?, failure_message = ?,"
+                " submitted_at = ?, completed_at = ?, updated_at = ? WHERE job_id = ?",
+                (job.invocation_arn, job.region, job.status, job.s3_uri, job.failure_message,
+                 job.submitted_at if job.invocation_arn else None, job.completed_at, time.time(), job.job_id)
+            )
+
+    def load(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE job_id = ? LIMIT 1", (job_id,)).fetchone()
+        return _job_from_row(row) if row else None
+
+    def latest(self, user_id: str, panel: str, window: float = REATTACH_WINDOW_SECONDS) -> Optional[str]:
+        """Id of the user's most recent job on ``panel`` created within ``window`` seconds.
+
+        Jobs another process queued but never submitted are skipped: nothing
+        here will ever submit them.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT job_id FROM jobs WHERE user_id = ? AND panel = ? AND created_at >= ?"
+                " AND NOT (status = ? AND owner IS NOT ?) ORDER BY created_at DESC LIMIT 1",
+                (user_id, panel, time.time() - window, QUEUED, self.owner)
+            ).fetchone()
+        return row["job_id"] if row else None
+
+    def history(self, user_id: str, limit: int = 20) -> List[dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE user_id = ? ORDER BY created_at DESC LIMIT ?", (user_id, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def find_reusable(self, request_key: str, max_age: float) -> Optional[Job]:
+        """A job for the same request that completed within ``max_age`` seconds or is still running"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE request_key = ? AND (status = 'InProgress' OR"
+                " (status = 'Completed' AND completed_at >= ?)) ORDER BY created_at DESC LIMIT 1",
+                (request_key, time.time() - max_age)
+            ).fetchone()
+        return _job_from_row(row) if row else None
+
+    def in_flight(self) -> List[Job]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE status = 'InProgress' GROUP BY job_id"
+            ).fetchall()
+        return [_job_from_row(row) for row in rows]
+
+    def expire_stale_queued(self, max_age: float = STALE_QUEUED_SECONDS):
+        """Fail queued jobs whose process went away before submitting them"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'Failed', failure_message = ?, completed_at = ?, updated_at = ?"
+                " WHERE status = ? AND updated_at < ?",
+                (INTERRUPTED_MESSAGE, now, now, QUEUED, now - max_age)
+            )
+
+
+def restore_job(store: JobStore, tracker: JobTracker, job_id: str) -> Optional[Job]:
+    """Return the tracked job for ``job_id``, adopting it from the store if this process has not seen it.
+
+    A job stored as Queued that this tracker does not hold was queued by a
+    process that is gone (or another replica), so nothing here would ever
+    submit it; it is settled as Failed instead of waiting forever.
+    """
+    job = tracker.get(job_id)
+    if job is None:
+        job = store.load(job_id)
+        if job is not None:
+            if job.status == QUEUED:
+                job.status = "Failed"
+                job.failure_message = INTERRUPTED_MESSAGE
+                job.completed_at = time.time()
+                store.update(job)
+            tracker.adopt(job)
+            job = tracker.get(job_id)
+    return job
+
+
+_store: Optional[JobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_job_store(tracker: JobTracker) -> JobStore:
+    """Return the process-wide job store; on first use, resume polling every job still in flight"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobStore()
+            _store.expire_stale_queued()
+            for job in _store.in_flight():
+                tracker.adopt(job)
+            tracker.add_listener(_store.update)
+        return _store
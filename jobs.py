@@ -0,0 +1,353 @@
+import logging
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+from metrics import count, observe, timed
+
+MIN_POLL_INTERVAL_SECONDS = 5
+MAX_POLL_INTERVAL_SECONDS = 30
+EXPECTED_DURATION_SECONDS = 300
+# Fractions of the expected duration between which polling is densest.
+DENSE_WINDOW = (0.6, 1.5)
+STRAGGLER_FACTOR = 2
+SUBMIT_TIME_SLACK_SECONDS = 60
+# Largest maxResults list_async_invokes accepts.
+LIST_PAGE_SIZE = 1000
+THROTTLING_ERROR_CODES = ("ThrottlingException", "TooManyRequestsException")
+# Polling for regions whose completions arrive as S3 events (see completions.py);
+# it only catches failures and missed events.
+EVENT_FALLBACK_POLL_SECONDS = 120
+# Settled jobs stay in memory this long; after that the job store has them.
+JOB_RETENTION_SECONDS = 3600
+OUTPUT_FILE_NAME = "output.mp4"
+
+TERMINAL_STATUSES = ("Completed", "Failed")
+# Held by the app before start_async_invoke has been called.
+QUEUED = "Queued"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    """A single Nova Reel async invocation as seen by the app"""
+    job_id: str
+    invocation_arn: Optional[str] = None
+    status: str = "InProgress"
+    s3_uri: Optional[str] = None
+    failure_message: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    completed_at: Optional[float] = None
+    # Region the job runs in; None means the tracker's default client.
+    region: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def progress(self, expected_duration: float = EXPECTED_DURATION_SECONDS) -> float:
+        if self.status == "Completed":
+            return 1.0
+        if self.status == QUEUED:
+            return 0.0
+        elapsed = (self.completed_at or time.time()) - self.submitted_at
+        return min(elapsed / expected_duration, 0.99)
+
+
+class JobTracker:
+    """Process-wide owner of Bedrock job polling.
+
+    Script threads register an invocation ARN and return immediately. A
+    single background thread checks every pending job at once through
+    ``list_async_invokes`` (one listing per region), so control-plane calls
+    scale with elapsed time rather than with the number of sessions. Later
+    reruns read the latest state with ``get``. Regions whose completions
+    arrive as events are only polled every ``EVENT_FALLBACK_POLL_SECONDS``.
+    Jobs are forgotten ``retention`` seconds after they settle.
+    """
+
+    def __init__(self, bedrock_runtime,
+                 min_interval: float = MIN_POLL_INTERVAL_SECONDS,
+                 max_interval: float = MAX_POLL_INTERVAL_SECONDS,
+                 expected_duration: float = EXPECTED_DURATION_SECONDS,
+                 retention: float = JOB_RETENTION_SECONDS):
+        self._bedrock_runtime = bedrock_runtime
+        self._regions: Dict[str, object] = {}
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._expected_duration = expected_duration
+        self._retention = retention
+        self._throttle_count = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._jobs: Dict[str, Job] = {}
+        self._by_arn: Dict[str, Job] = {}
+        self._by_output_id: Dict[str, Job] = {}
+        # Region -> fallback poll interval, while its completion events flow.
+        self._event_regions: Dict[Optional[str], float] = {}
+        self._polled_at: Dict[Optional[str], float] = {}
+        self._listeners: List[Callable[[Job], None]] = []
+        self._thread = threading.Thread(target=self._run, name="job-tracker", daemon=True)
+        self._thread.start()
+
+    def track(self, invocation_arn: str) -> Job:
+        """Register a started invocation and return its job record"""
+        job = self.enqueue()
+        self.start(job, invocation_arn)
+        return job
+
+    def enqueue(self) -> Job:
+        """Register a job that has not been submitted to Bedrock yet"""
+        job = Job(job_id=uuid.uuid4().hex, status=QUEUED)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        return job
+
+    def add_region(self, region: str, bedrock_runtime):
+        """Poll jobs started in ``region`` through that region's client"""
+        with self._lock:
+            self._regions[region] = bedrock_runtime
+
+    def start(self, job: Job, invocation_arn: str, region: Optional[str] = None):
+        """Record that a queued job has been started as ``invocation_arn`` (in ``region``)"""
+        with self._lock:
+            job.invocation_arn = invocation_arn
+            job.region = region
+            now = time.time()
+            observe("queue_wait", now - job.submitted_at)
+            job.submitted_at = now
+            job.status = "InProgress"
+            self._index(job)
+        self._wakeup.set()
+        self._notify(job)
+
+    def adopt(self, job: Job):
+        """Track a job recorded elsewhere (e.g. restored from the job store)"""
+        with self._lock:
+            if job.job_id in self._jobs:
+                return
+            self._jobs[job.job_id] = job
+            if job.invocation_arn:
+                self._index(job)
+        self._wakeup.set()
+
+    def use_completion_events(self, region: Optional[str], fallback_interval: float = EVENT_FALLBACK_POLL_SECONDS):
+        """Completions in ``region`` now arrive through ``complete_output``; poll it only as a fallback"""
+        with self._lock:
+            self._event_regions[region] = fallback_interval
+            self._polled_at[region] = time.time()
+
+    def stop_completion_events(self, region: Optional[str]):
+        """Go back to polling ``region`` on the normal schedule"""
+        with self._lock:
+            self._event_regions.pop(region, None)
+        self._wakeup.set()
+
+    def complete_output(self, bucket: str, key: str) -> Optional[Job]:
+        """Settle the job whose ``output.mp4`` was just written at ``bucket``/``key``, if it is tracked here"""
+        prefix = key.rsplit("/", 1)[0]
+        with self._lock:
+            job = self._by_output_id.get(prefix.rsplit("/", 1)[-1])
+        count("completion_event", result="matched" if job is not None else "unknown")
+        if job is not None:
+            self._apply(job, {
+                "status": "Completed",
+                "outputDataConfig": {"s3OutputDataConfig": {"s3Uri": f"s3://{bucket}/{prefix}"}}
+            })
+        return job
+
+    def fail(self, job: Job, message: str):
+        """Settle a job that never reached Bedrock"""
+        self._apply(job, {"status": "Failed", "failureMessage": message})
+
+    def add_listener(self, callback: Callable[[Job], None]):
+        """Call ``callback(job)`` whenever a job is started on Bedrock or settles"""
+        self._listeners.append(callback)
+
+    def in_flight(self, region: Optional[str] = None) -> int:
+        """Jobs running on Bedrock, in ``region`` or (if None) anywhere"""
+        jobs = self.pending()
+        if region is not None:
+            jobs = [job for job in jobs if job.region == region]
+        return len(jobs)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def pending(self) -> List[Job]:
+        with self._lock:
+            return [job for job in self._jobs.values() if job.status == "InProgress"]
+
+    def poll_interval(self, age: float) -> float:
+        """Seconds to wait before checking a job that has been running for ``age`` seconds.
+
+        Checks are sparse while a job is young, densest around the typical
+        completion time and thin out again for stragglers.
+        """
+        dense_start = DENSE_WINDOW[0] * self._expected_duration
+        dense_end = DENSE_WINDOW[1] * self._expected_duration
+        if age < dense_start:
+            interval = (dense_start - age) / 2
+        elif age <= dense_end:
+            interval = self._min_interval
+        else:
+            interval = self._min_interval + (age - dense_end) / 10
+        return max(self._min_interval, min(interval, self._max_interval))
+
+    def _index(self, job: Job):
+        self._by_arn[job.invocation_arn] = job
+        # Bedrock writes each invocation's output under its ARN's last segment.
+        self._by_output_id[job.invocation_arn.rsplit("/", 1)[-1]] = job
+
+    def _evict_settled(self):
+        """Drop jobs settled more than ``retention`` seconds ago (``restore_job`` reloads them from the store)"""
+        cutoff = time.time() - self._retention
+        with self._lock:
+            expired = [job for job in self._jobs.values() if job.done and (job.completed_at or 0) < cutoff]
+            for job in expired:
+                del self._jobs[job.job_id]
+                if job.invocation_arn:
+                    self._by_arn.pop(job.invocation_arn, None)
+                    self._by_output_id.pop(job.invocation_arn.rsplit("/", 1)[-1], None)
+
+    def _due_in(self, job: Job, now: float) -> float:
+        delay = self.poll_interval(now - job.submitted_at)
+        with self._lock:
+            fallback = self._event_regions.get(job.region)
+            if fallback is not None:
+                delay = max(delay, self._polled_at.get(job.region, now) + fallback - now)
+        return delay
+
+    def _pollable(self, jobs: List[Job]) -> List[Job]:
+        """``jobs`` minus those in event-driven regions whose fallback poll is not due yet"""
+        now = time.time()
+        with self._lock:
+            return [
+                job for job in jobs
+                if job.region not in self._event_regions
+                or now - self._polled_at.get(job.region, now) >= self._event_regions[job.region]
+            ]
+
+    def _next_delay(self) -> float:
+        if self._throttle_count:
+            # Full jitter keeps replicas that were throttled together from
+            # retrying in lockstep.
+            ceiling = min(self._max_interval * 4, self._min_interval * 2 ** self._throttle_count)
+            return random.uniform(self._min_interval, ceiling)
+        jobs = self.pending()
+        if not jobs:
+            return self._max_interval
+        now = time.time()
+        return min(self._due_in(job, now) for job in jobs)
+
+    def _run(self):
+        next_poll = time.time() + self._next_delay()
+        while True:
+            if self._wakeup.wait(max(0.0, next_poll - time.time())):
+                self._wakeup.clear()
+                # A newly tracked job can only pull the next round earlier.
+                next_poll = min(next_poll, time.time() + self._next_delay())
+                continue
+            self._evict_settled()
+            jobs = self._pollable(self.pending())
+            if jobs:
+                try:
+                    with timed("bedrock_poll"):
+                        self._poll(jobs)
+                    self._throttle_count = 0
+                except ClientError as e:
+                    if e.response["Error"]["Code"] in THROTTLING_ERROR_CODES:
+                        self._throttle_count += 1
+                        logger.info("Job polling throttled, backing off (attempt %d)", self._throttle_count)
+                    else:
+                        logger.warning("Error polling jobs: %s", e)
+                except Exception as e:
+                    # Transient API errors are retried on the next round.
+                    logger.warning("Error polling jobs: %s", e)
+            next_poll = time.time() + self._next_delay()
+
+    def _client(self, region: Optional[str]):
+        with self._lock:
+            return self._regions.get(region, self._bedrock_runtime)
+
+    def _poll(self, jobs: List[Job]):
+        """Check all ``jobs`` with one listing per region and terminal status"""
+        by_region: Dict[Optional[str], List[Job]] = {}
+        for job in jobs:
+            by_region.setdefault(job.region, []).append(job)
+        for region, region_jobs in by_region.items():
+            self._poll_region(self._client(region), region_jobs)
+            with self._lock:
+                self._polled_at[region] = time.time()
+
+    def _poll_region(self, bedrock_runtime, jobs: List[Job]):
+        # A job the listings keep missing (clock skew, eventual consistency)
+        # is checked directly once it is well past its expected duration, and
+        # no longer widens the listing window for everyone else.
+        now = time.time()
+        cutoff = STRAGGLER_FACTOR * self._expected_duration
+        stragglers = [job for job in jobs if now - job.submitted_at > cutoff]
+        listed = [job for job in jobs if now - job.submitted_at <= cutoff]
+        if listed:
+            oldest = min(job.submitted_at for job in listed)
+            submit_time_after = datetime.fromtimestamp(oldest - SUBMIT_TIME_SLACK_SECONDS, tz=timezone.utc)
+            paginator = bedrock_runtime.get_paginator("list_async_invokes")
+            for status in TERMINAL_STATUSES:
+                pages = paginator.paginate(submitTimeAfter=submit_time_after, statusEquals=status,
+                                           PaginationConfig={"PageSize": LIST_PAGE_SIZE})
+                for page in pages:
+                    for summary in page.get("asyncInvokeSummaries", []):
+                        with self._lock:
+                            job = self._by_arn.get(summary["invocationArn"])
+                        if job is not None:
+                            self._apply(job, summary)
+
+        for job in stragglers:
+            if not job.done:
+                self._apply(job, bedrock_runtime.get_async_invoke(invocationArn=job.invocation_arn))
+
+    def _apply(self, job: Job, response: dict):
+        status = response["status"]
+        with self._lock:
+            if job.done:
+                return
+            if status == "Completed":
+                job.s3_uri = response["outputDataConfig"]["s3OutputDataConfig"]["s3Uri"]
+            elif status == "Failed":
+                job.failure_message = response.get("failureMessage", "Unknown error")
+            if status in TERMINAL_STATUSES:
+                job.completed_at = time.time()
+            job.status = status
+        if job.done:
+            if job.invocation_arn:
+                # Time from submission until the tracker noticed completion.
+                observe("generation", job.completed_at - job.submitted_at, outcome=job.status.lower())
+            self._notify(job)
+
+    def _notify(self, job: Job):
+        for callback in self._listeners:
+            try:
+                callback(job)
+            except Exception as e:
+                logger.warning("Job listener failed for %s: %s", job.job_id, e)
+
+
+_tracker: Optional[JobTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_job_tracker(bedrock_runtime) -> JobTracker:
+    """Return the process-wide tracker, creating it on first use"""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = JobTracker(bedrock_runtime)
+        return _tracker
@@ -1,114 +1,246 @@
 import streamlit as st
-import requests
+import json
+import time
 import urllib.parse
-import base64
-import io
-from PIL import Image
+import uuid
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from styles import custom_css
-from aws_utils import AWSManager
-from helpers import prepare_reference_image, check_job_status, show_loading_animation
-
-# AWS Configuration
-AWS_REGION = "us-east-1"
-OUTPUT_S3_BUCKET = "aws-summit-nova-reel"
-OUTPUT_S3_PREFIX = "nova-reel-output/"
-CATALOG_BUCKET = "aws-summit-product-catalog"
-MODEL_ID = "amazon.nova-reel-v1:1"
-
-# Product Categories
-PRODUCT_CATEGORIES = {
-    "Food & Beverages": "products/food/",
-    "Nature": "products/nature/",
-    "Home & Living": "products/home-living/"
-}
-
-# Initialize AWS Manager
-aws_manager = AWSManager(AWS_REGION)
+from config import AWS_REGION, CATALOG_BUCKET, CREATIVE_PROMPTS, PRODUCT_CATEGORIES
+from aws_utils import CATALOG_PAGE_SIZE, get_aws_manager
+from image_pipeline import MAX_UPLOAD_BYTES, ingest_upload, prepare_image
+from helpers import prepare_reference_image, render_job_status, show_loading_animation
+from jobs import get_job_tracker
+from job_store import get_job_store, restore_job
+from admission import get_submission_queue
+from completions import start_completion_listeners
+from generation import default_prompt, submit_video_job
+from thumbnails import get_thumbnail_cache
+from prefetch import get_prefetcher
+from image_store import get_image_store
+from prewarm import start_prewarm
+from precompute import start_precompute
+from ops_server import start_ops_server
+from metrics import observe_rerun, start_metrics_file, timed
+from postprocess import get_postprocessor
+from batch import DEFAULT_MAX_IN_FLIGHT, get_batch, start_batch
 
-def create_video(key_suffix=""):
-    st.markdown("### ✨ Create Your Video")
-    prompt = st.text_area(
-        "Describe how you want your video to look",
-        value=st.session_state.current_prompt or (
-            f"Create a cinematic video showcasing {st.session_state.selected_image_name} with dynamic camera movements and professional lighting."
-            if st.session_state.selected_image_name else
-            "Create a cinematic video with dynamic camera movements and professional lighting."
-        ),
-        height=100,
-        key=f"prompt_input_{key_suffix}"
-    )
+rerun_started = time.perf_counter()
 
-    if st.button("🚀 Generate Video", type="primary", use_container_width=True, key=f"generate_btn_{key_suffix}"):
-        if not prompt.strip():
-            st.error("Please enter a prompt before generating the video.")
-            return
+# Shared AWS Manager; clients and connection pools live for the whole process
+aws_manager = get_aws_manager(AWS_REGION)
 
+# No-ops when serve.py already started them at launch
+start_prewarm(AWS_REGION)
+start_precompute(AWS_REGION)
+start_ops_server()
+start_metrics_file()
+# Builds posters and previews as jobs complete
+get_postprocessor(aws_manager)
+# Registers every generation region with the tracker before jobs are restored
+get_submission_queue(get_job_tracker(aws_manager.bedrock_runtime))
+# No-op unless an endpoint has a completion_queue_url
+start_completion_listeners(get_job_tracker(aws_manager.bedrock_runtime))
+
+STATUS_REFRESH_SECONDS = 5
+
+def run_fragment(panel, body, run_every=None):
+    """Render ``body`` as an independently rerunnable fragment, timing each run"""
+    def timed_body():
+        started = time.perf_counter()
         try:
-            text_to_video_params = {"text": prompt}
-            if st.session_state.selected_image:
-                base64_image = prepare_reference_image(st.session_state.selected_image)
-                text_to_video_params["images"] = [{"format": "jpeg", "source": {"bytes": base64_image}}]
-            model_input = {
-                "taskType": "TEXT_VIDEO",
-                "textToVideoParams": text_to_video_params,
-                "videoGenerationConfig": {
-                    "durationSeconds": 6,
-                    "fps": 24,
-                    "dimension": "1280x720"
-                }
-            }
-
-            output_config = {
-                "s3OutputDataConfig": {
-                    "s3Uri": f"s3://{OUTPUT_S3_BUCKET}/{OUTPUT_S3_PREFIX}"
-                }
-            }
-
-            with st.spinner("🎥 Creating your video..."):
-                response = aws_manager.bedrock_runtime.start_async_invoke(
-                    modelId=MODEL_ID,
-                    modelInput=model_input,
-                    outputDataConfig=output_config
-                )
+            body()
+        finally:
+            observe_rerun(time.perf_counter() - started, kind="fragment", panel=panel)
 
-            s3_uri = check_job_status(aws_manager.bedrock_runtime, response["invocationArn"])
-
-            if s3_uri:
-                presigned_url = aws_manager.generate_presigned_url(s3_uri)
-                st.video(presigned_url)
-                # Display the presigned URL as a hyperlink
-                st.markdown(f"**Video URL:** [Click to open in browser]({presigned_url})", unsafe_allow_html=True)
-                col1, col2 = st.columns(2)
-                with col1:
-                    video_content = requests.get(presigned_url).content
-                    b64_video = base64.b64encode(video_content).decode()
-                    st.markdown(f"""
-                        <a href="data:video/mp4;base64,{b64_video}" 
-                           download="generated_video.mp4" 
-                           class="download-button">
-                           📥 Download Video
-                        </a>
-                    """, unsafe_allow_html=True)
-                with col2:
-                    linkedin_text = "🌟 Check out this AI-generated video created using Amazon Bedrock and Nova Reel! #AI #AWS #AWSSummitBengaluru"
-                    linkedin_url = f"https://www.linkedin.com/feed/?shareActive=true&text={urllib.parse.quote(linkedin_text)}"
-                    st.markdown(f"""
-                        <a href="{linkedin_url}" 
-                           target="_blank" 
-                           class="download-button linkedin">
-                           📤 Share on LinkedIn
-                        </a>
-                    """, unsafe_allow_html=True)
+    st.fragment(timed_body, run_every=run_every)()
 
-        except Exception as e:
-            st.error(f"❌ Error: {e}")
+def rerun_fragment():
+    """Rerun just the fragment being interacted with (the whole app if the click came in on a full run)"""
+    ctx = get_script_run_ctx()
+    st.rerun(scope="fragment" if ctx and ctx.fragment_ids_this_run else "app")
+
+def session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "default"
+
+def user_id():
+    """Stable id carried in the URL (``?uid=``) so reloads, reconnects and bookmarks find their jobs"""
+    uid = st.query_params.get("uid")
+    if not uid:
+        uid = st.query_params["uid"] = uuid.uuid4().hex
+    return uid
+
+def job_store():
+    return get_job_store(get_job_tracker(aws_manager.bedrock_runtime))
+
+def image_lease(panel):
+    # Per panel, so clearing one tab's selection never unpins the other's image.
+    return f"{session_id()}:{panel}"
+
+def select_image(panel, image_bytes, name, product_key=None, product_etag=None):
+    """Point ``panel`` ("catalog" or "custom") at an image held once in the shared image store.
+
+    Each panel keeps its own selection, so a tab's fragment never has to
+    rerun the other tab to stay consistent.
+    """
+    clear_selection(panel)
+    st.session_state[f"selected_image_id_{panel}"] = get_image_store().put(image_bytes, image_lease(panel))
+    st.session_state[f"selected_image_name_{panel}"] = name
+    st.session_state[f"selected_product_key_{panel}"] = product_key
+    st.session_state[f"selected_product_etag_{panel}"] = product_etag
+
+def clear_selection(panel):
+    if st.session_state[f"selected_image_id_{panel}"]:
+        get_image_store().release(st.session_state[f"selected_image_id_{panel}"], image_lease(panel))
+    for field in ("selected_image_id", "selected_image_name", "selected_product_key", "selected_product_etag"):
+        st.session_state[f"{field}_{panel}"] = None
+
+def selected_image_bytes(panel):
+    digest = st.session_state[f"selected_image_id_{panel}"]
+    if not digest:
+        return None
+    image_bytes = get_image_store().get(digest, image_lease(panel))
+    product_key = st.session_state[f"selected_product_key_{panel}"]
+    if image_bytes is None and product_key:
+        # The lease lapsed and the image was evicted; catalog images can be fetched again.
+        image_bytes = aws_manager.load_image_from_s3(CATALOG_BUCKET, product_key)
+        if image_bytes:
+            st.session_state[f"selected_image_id_{panel}"] = get_image_store().put(image_bytes, image_lease(panel))
+    return image_bytes
+
+def reference_image_payload(panel, image_bytes):
+    """Model payload for ``panel``'s selection, from the catalog's precomputed copy when there is one"""
+    product_key = st.session_state[f"selected_product_key_{panel}"]
+    if product_key:
+        model_ready = aws_manager.load_model_ready_image(CATALOG_BUCKET, product_key,
+                                                         st.session_state[f"selected_product_etag_{panel}"])
+        if model_ready is not None:
+            return prepare_reference_image(model_ready)
+    return prepare_reference_image(image_bytes, st.session_state[f"selected_image_id_{panel}"])
+
+def ingested_upload(uploaded_file):
+    """Validate and normalize an upload once per file; reruns reuse the result"""
+    cached = st.session_state.get("ingested_upload")
+    if cached is None or cached[0] != uploaded_file.file_id:
+        try:
+            upload, error = ingest_upload(uploaded_file, uploaded_file.size), None
+        except ValueError as e:
+            upload, error = None, str(e)
+        cached = st.session_state.ingested_upload = (uploaded_file.file_id, upload, error)
+    _, upload, error = cached
+    if error:
+        st.error(f"❌ {error}")
+    return upload
+
+def selected_image_preview(panel):
+    image_bytes = selected_image_bytes(panel)
+    if image_bytes is None:
+        st.warning("Your selected image has expired. Please select it again.")
+        return None
+    return prepare_image(image_bytes, st.session_state[f"selected_image_id_{panel}"]).preview
+
+def show_video_player(s3_uri, prefer_preview=False):
+    """Poster-first player; with ``prefer_preview`` the low-bitrate preview plays when one exists"""
+    presigned_url = aws_manager.generate_presigned_url(s3_uri)
+    assets = get_postprocessor(aws_manager).assets(s3_uri)
+    poster = f' poster="{assets["poster"]}"' if assets else ""
+    source = assets["preview"] if assets and prefer_preview else presigned_url
+    # preload="none": the browser shows the poster and fetches the video only when played.
+    st.markdown(f"""
+        <video class="result-video" controls preload="none"{poster} src="{source}"></video>
+    """, unsafe_allow_html=True)
+    return presigned_url
+
+def show_video_result(s3_uri):
+    presigned_url = show_video_player(s3_uri)
+    # Display the presigned URL as a hyperlink
+    st.markdown(f"**Video URL:** [Click to open in browser]({presigned_url})", unsafe_allow_html=True)
+    col1, col2 = st.columns(2)
+    with col1:
+        # The browser fetches the file straight from S3, so the video never
+        # passes through this server or gets re-embedded into the page.
+        download_url = aws_manager.generate_presigned_url(s3_uri, download_name="generated_video.mp4")
+        st.markdown(f"""
+            <a href="{download_url}" 
+               download="generated_video.mp4" 
+               class="download-button">
+               📥 Download Video
+            </a>
+        """, unsafe_allow_html=True)
+    with col2:
+        linkedin_text = "🌟 Check out this AI-generated video created using Amazon Bedrock and Nova Reel! #AI #AWS #AWSSummitBengaluru"
+        linkedin_url = f"https://www.linkedin.com/feed/?shareActive=true&text={urllib.parse.quote(linkedin_text)}"
+        st.markdown(f"""
+            <a href="{linkedin_url}" 
+               target="_blank" 
+               class="download-button linkedin">
+               📤 Share on LinkedIn
+            </a>
+        """, unsafe_allow_html=True)
+
+def show_job(key_suffix):
+    """Show the session's job for this panel, refreshing only while it runs"""
+    job_id = st.session_state.get(f"job_id_{key_suffix}")
+    if not job_id:
+        return
+    # Jobs from before a reconnect or restart are adopted from the job store.
+    job = restore_job(job_store(), get_job_tracker(aws_manager.bedrock_runtime), job_id)
+    if job is None:
+        st.session_state[f"job_id_{key_suffix}"] = None
+        return
+    was_done = job.done
+
+    def job_panel():
+        queue = get_submission_queue(get_job_tracker(aws_manager.bedrock_runtime))
+        s3_uri = render_job_status(job, queue.position(job))
+        if job.done and not was_done:
+            # Leave the timed fragment once the job settles; the full rerun
+            # also brings My Videos up to date.
+            st.rerun()
+        if s3_uri:
+            show_video_result(s3_uri)
+
+    run_fragment("job", job_panel, run_every=None if was_done else STATUS_REFRESH_SECONDS)
+
+def create_video(key_suffix=""):
+    """Prompt, generate button and job status for a panel, rerun on their own"""
+    def generate_panel():
+        st.markdown("### ✨ Create Your Video")
+        prompt = st.text_area(
+            "Describe how you want your video to look",
+            value=st.session_state.current_prompt or default_prompt(st.session_state[f"selected_image_name_{key_suffix}"]),
+            height=100,
+            key=f"prompt_input_{key_suffix}"
+        )
+
+        if st.button("🚀 Generate Video", type="primary", use_container_width=True, key=f"generate_btn_{key_suffix}"):
+            if not prompt.strip():
+                st.error("Please enter a prompt before generating the video.")
+                return
+
+            try:
+                base64_image = None
+                image_bytes = selected_image_bytes(key_suffix)
+                if image_bytes:
+                    with timed("prepare_reference_image", tab=key_suffix):
+                        base64_image = reference_image_payload(key_suffix, image_bytes)
+                with st.spinner("🎥 Creating your video..."), timed("submit", tab=key_suffix):
+                    job = submit_video_job(aws_manager, prompt, base64_image, session_id(),
+                                           user_id=user_id(), panel=key_suffix)
+                st.session_state[f"job_id_{key_suffix}"] = job.job_id
+            except Exception as e:
+                st.error(f"❌ Error: {e}")
+
+        show_job(key_suffix)
+
+    run_fragment("generate", generate_panel)
 
 def create_video_from_prompt():
     st.markdown("### ✨ Generate Video with Custom Prompt")
     st.markdown("Create a video using just your prompt without requiring an image.")
     prompt = st.text_area(
         "Enter your detailed video prompt",
-        value="Create a cinematic video with dynamic camera movements and professional lighting.",
+        value=default_prompt(),
         height=150,
         key="custom_prompt_only"
     )
@@ -117,134 +249,89 @@ def create_video_from_prompt():
             st.error("Please enter a prompt before generating the video.")
             return
         try:
-            text_to_video_params = {"text": prompt}
-            model_input = {
-                "taskType": "TEXT_VIDEO",
-                "textToVideoParams": text_to_video_params,
-                "videoGenerationConfig": {
-                    "durationSeconds": 6,
-                    "fps": 24,
-                    "dimension": "1280x720"
-                }
-            }
-            output_config = {
-                "s3OutputDataConfig": {
-                    "s3Uri": f"s3://{OUTPUT_S3_BUCKET}/{OUTPUT_S3_PREFIX}"
-                }
-            }
-            with st.spinner("🎥 Creating your video..."):
-                response = aws_manager.bedrock_runtime.start_async_invoke(
-                    modelId=MODEL_ID,
-                    modelInput=model_input,
-                    outputDataConfig=output_config
-                )
-            s3_uri = check_job_status(aws_manager.bedrock_runtime, response["invocationArn"])
-            if s3_uri:
-                presigned_url = aws_manager.generate_presigned_url(s3_uri)
-                st.video(presigned_url)
-                # Add this line to display the presigned URL as a hyperlink
-                st.markdown(f"**Presigned URL:** [Click to open video in new tab]({presigned_url})", unsafe_allow_html=True)
-                col1, col2 = st.columns(2)
-                with col1:
-                    video_content = requests.get(presigned_url).content
-                    b64_video = base64.b64encode(video_content).decode()
-                    st.markdown(f"""
-                        <a href="data:video/mp4;base64,{b64_video}" 
-                           download="generated_video.mp4" 
-                           class="download-button">
-                           📥 Download Video
-                        </a>
-                    """, unsafe_allow_html=True)
-                with col2:
-                    linkedin_text = "🌟 Check out this AI-generated video created using Amazon Bedrock and Nova Reel! #AI #AWS #AWSSummitBengaluru"
-                    linkedin_url = f"https://www.linkedin.com/feed/?shareActive=true&text={urllib.parse.quote(linkedin_text)}"
-                    st.markdown(f"""
-                        <a href="{linkedin_url}" 
-                           target="_blank" 
-                           class="download-button linkedin">
-                           📤 Share on LinkedIn
-                        </a>
-                    """, unsafe_allow_html=True)
+            with st.spinner("🎥 Creating your video..."), timed("submit", tab="prompt"):
+                job = submit_video_job(aws_manager, prompt, session_id=session_id(),
+                                       user_id=user_id(), panel="prompt")
+            st.session_state["job_id_prompt"] = job.job_id
         except Exception as e:
             st.error(f"❌ Error: {e}")
 
-# Page configuration
-st.set_page_config(
-    page_title="AI Motion Ad Creator",
-    page_icon="🎬",
-    layout="wide",
-    initial_sidebar_state="collapsed"
-)
+    show_job("prompt")
 
-# Inject custom CSS
-st.markdown(custom_css, unsafe_allow_html=True)
+HISTORY_STATUS_LABELS = {"Queued": "⏳ Queued", "InProgress": "🎥 In progress", "Completed": "✅ Ready", "Failed": "❌ Failed"}
 
-# Modern animated header
-st.markdown("""
-    <div class="header-container">
-        <h1 style='font-size: 2.5rem; font-weight: 700; margin-bottom: 0.5rem;'>🎬 AI Motion Ad Creator</h1>
-        <p style='font-size: 1.2rem; opacity: 0.9;'>Transform your product images into stunning video content with AI</p>
-    </div>
-""", unsafe_allow_html=True)
+def show_history():
+    """The user's recent videos, read from the job store without calling Bedrock"""
+    st.markdown("### 🎞️ My Videos")
+    st.caption("Bookmark this page to come back to your videos later.")
+    entries = job_store().history(user_id())
+    if not entries:
+        st.info("Videos you generate will appear here.")
+        return
+    cols = st.columns(3)
+    for idx, entry in enumerate(entries):
+        with cols[idx % 3]:
+            created = time.strftime("%d %b %H:%M", time.localtime(entry["created_at"]))
+            st.markdown(f"**{HISTORY_STATUS_LABELS.get(entry['status'], entry['status'])}** · {created}")
+            st.caption(entry["prompt"])
+            if entry["status"] == "Completed" and entry["s3_uri"]:
+                show_video_player(entry["s3_uri"], prefer_preview=True)
+                download_url = aws_manager.generate_presigned_url(entry["s3_uri"], download_name="generated_video.mp4")
+                st.markdown(f"""
+                    <a href="{download_url}" download="generated_video.mp4" class="download-button">📥 Download</a>
+                """, unsafe_allow_html=True)
+            elif entry["status"] == "Failed" and entry["failure_message"]:
+                st.caption(entry["failure_message"])
 
-# Initialize session state
-if 'selected_image' not in st.session_state:
-    st.session_state.selected_image = None
-if 'selected_image_name' not in st.session_state:
-    st.session_state.selected_image_name = None
-if 'current_prompt' not in st.session_state:
-    st.session_state.current_prompt = ""
-if 'current_product_key' not in st.session_state:
-    st.session_state.current_product_key = None
+def show_batch(batch_id):
+    batch = get_batch(batch_id)
+    if batch is None:
+        st.session_state.batch_id = None
+        return
+    was_finished = batch.finished
 
-with st.sidebar:
-    # --- LinkedIn Post Card ---
-    linkedin_text = (
-        "🌟 Check out this AI-generated video created using Amazon Bedrock and Nova Reel! "
-        "#AI #AWS #AWSSummitBengaluru"
-    )
-    st.markdown(
-        f"""
-        <div style="
-            background: linear-gradient(90deg, #0077b5 0%, #00a0dc 100%);
-            padding: 1.1em 1em 1em 1em;
-            border-radius: 14px;
-            margin-bottom: 1.5em;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.07);
-            color: white;
-        ">
-            <div style="display: flex; align-items: center;">
-                <img src="https://cdn-icons-png.flaticon.com/512/174/174857.png" width="28" style="margin-right: 0.7em; border-radius: 6px; box-shadow: 0 2px 6px rgba(0,0,0,0.07);" />
-                <span style="font-weight: 600; font-size: 1.09em;">Share on LinkedIn</span>
-            </div>
-            <div style="margin-top: 1em; background: rgba(255,255,255,0.13); border-radius: 8px; padding: 0.8em; color: #fff;">
-                {linkedin_text}
-            </div>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
-    st.code(linkedin_text, language="markdown")  # Built-in copy button[2][6]
-
-    # --- Creative Prompts ---
-    st.markdown("### 💡 Creative Prompts")
-    creative_prompts = [
-        "Cinematic dolly shot with beautiful lighting and focus transitions",
-        "360-degree pan around the product with particle effects",
-        "Modern tech-style presentation with floating elements"
-    ]
-    for prompt in creative_prompts:
-        if st.button(prompt, key=f"prompt_{prompt}", use_container_width=True):
-            st.session_state.current_prompt = prompt
+    def batch_panel():
+        counts = batch.counts()
+        total = len(batch.items)
+        settled = counts.get("Completed", 0) + counts.get("Failed", 0)
+        st.progress(settled / total if total else 0.0)
+        st.markdown(" · ".join(f"**{status}:** {count}" for status, count in sorted(counts.items())) or "Preparing images...")
+        manifest = batch.manifest()
+        if manifest:
+            st.dataframe(manifest, use_container_width=True)
+        if batch.finished and not was_finished:
             st.rerun()
+        if batch.finished:
+            st.download_button(
+                "📥 Download Manifest",
+                data=json.dumps(manifest, indent=2),
+                file_name=f"batch-{batch.batch_id[:8]}.json",
+                mime="application/json",
+                use_container_width=True
+            )
 
+    run_fragment("batch", batch_panel, run_every=None if was_finished else STATUS_REFRESH_SECONDS)
 
+def create_batch():
+    st.markdown("### 📦 Batch Generation")
+    st.markdown("Generate a video for every product in a category, optionally for several prompts each.")
+    category = st.selectbox("Product Category", options=list(PRODUCT_CATEGORIES.keys()), key="batch_category")
+    prompts = st.multiselect("Creative Prompts", options=CREATIVE_PROMPTS, key="batch_prompts")
+    extra_prompts = st.text_area("Additional prompts (one per line)", key="batch_extra_prompts")
+    max_in_flight = st.number_input("Max jobs in flight", min_value=1, max_value=20, value=DEFAULT_MAX_IN_FLIGHT, key="batch_max_in_flight")
+    st.caption("With no prompts selected, each product gets the default cinematic prompt.")
+    if st.button("🚀 Start Batch", type="primary", use_container_width=True, key="start_batch"):
+        try:
+            batch = start_batch(aws_manager, category, prompts + extra_prompts.splitlines(), int(max_in_flight))
+            st.session_state.batch_id = batch.batch_id
+        except Exception as e:
+            st.error(f"❌ Error: {e}")
 
-# Main content area
-tab1, tab2, tab3 = st.tabs(["📑 Product Catalog", "⬆️ Custom Upload", "✏️ Prompt Only"])
+    if st.session_state.get("batch_id"):
+        show_batch(st.session_state.batch_id)
 
-# Product Catalog Tab
-with tab1:
+def show_catalog():
+    """Catalog tab: category, search and paging, the selected product and its generation panel"""
     col1, col2 = st.columns([0.4, 0.6])
     with col1:
         st.markdown("### Select Image")
@@ -253,93 +340,220 @@ with tab1:
             options=list(PRODUCT_CATEGORIES.keys()),
             key="category_selector"
         )
-        products = aws_manager.get_product_images_from_s3(
+        catalog = aws_manager.list_products(
             CATALOG_BUCKET, 
             PRODUCT_CATEGORIES[selected_category]
         )
-        if not products:
+        if not catalog:
             st.warning(f"No products found in {selected_category} category.")
         else:
             st.markdown("#### Available Images")
             # If a product is selected, show only that product
-            if st.session_state.selected_image and st.session_state.current_product_key:
-                selected_product = next((p for p in products if p['key'] == st.session_state.current_product_key), None)
-                if selected_product:
-                    st.image(selected_product['image_url'], caption=selected_product['name'], use_container_width=True)
+            if st.session_state.selected_product_key_catalog:
+                get_prefetcher(aws_manager).cancel(session_id())
+                if any(p['key'] == st.session_state.selected_product_key_catalog for p in catalog):
+                    st.image(
+                        aws_manager.presign_catalog_image(CATALOG_BUCKET, st.session_state.selected_product_key_catalog),
+                        caption=st.session_state.selected_image_name_catalog,
+                        use_container_width=True
+                    )
                     if st.button("View All Products", key="view_all", use_container_width=True):
-                        st.session_state.selected_image = None
-                        st.session_state.selected_image_name = None
-                        st.session_state.current_product_key = None
-                        st.rerun()
+                        clear_selection("catalog")
+                        rerun_fragment()
             else:
+                query = st.text_input("Search products", key="catalog_search", placeholder="Filter by name")
+                # Start from the first page whenever the category or search changes.
+                if st.session_state.get("catalog_view") != (selected_category, query):
+                    st.session_state.catalog_view = (selected_category, query)
+                    st.session_state.catalog_page = 0
+                products, total = aws_manager.get_product_page(
+                    CATALOG_BUCKET,
+                    PRODUCT_CATEGORIES[selected_category],
+                    query,
+                    st.session_state.catalog_page,
+                    CATALOG_PAGE_SIZE
+                )
+                page_count = max(1, -(-total // CATALOG_PAGE_SIZE))
+                if not products:
+                    st.info("No products match your search.")
+                thumbnails = get_thumbnail_cache().thumbnails_for(aws_manager.s3_client, CATALOG_BUCKET, products)
+                # Fetch what is likely to be selected next while the user looks at the page.
+                prefetcher = get_prefetcher(aws_manager)
+                prefetcher.prefetch(session_id(), CATALOG_BUCKET, products + prefetcher.popular(CATALOG_BUCKET, catalog))
                 cols = st.columns(3)
                 for idx, product in enumerate(products):
                     with cols[idx % 3]:
-                        st.image(product['image_url'], caption=product['name'], use_container_width=True)
-                        if st.button("Select", key=f"btn_{product['name']}", use_container_width=True):
-                            selected_image_bytes = aws_manager.load_image_from_s3(
-                                CATALOG_BUCKET, 
-                                product['key']
-                            )
-                            if selected_image_bytes:
-                                st.session_state.selected_image = selected_image_bytes
-                                st.session_state.selected_image_name = product['name']
-                                st.session_state.current_product_key = product['key']
-                                st.rerun()
-    if st.session_state.selected_image:
+                        st.image(
+                            thumbnails.get(product['key'], product['image_url']),
+                            caption=product['name'],
+                            use_container_width=True
+                        )
+                        if st.button("Select", key=f"btn_{product['key']}", use_container_width=True):
+                            image_bytes = prefetcher.load(CATALOG_BUCKET, product)
+                            if image_bytes:
+                                select_image("catalog", image_bytes, product['name'], product['key'],
+                                             product['etag'])
+                                rerun_fragment()
+                if page_count > 1:
+                    col_prev, col_page, col_next = st.columns([0.3, 0.4, 0.3])
+                    with col_prev:
+                        if st.button("◀ Previous", key="catalog_prev", disabled=st.session_state.catalog_page == 0, use_container_width=True):
+                            st.session_state.catalog_page -= 1
+                            rerun_fragment()
+                    with col_page:
+                        st.markdown(f"<div style='text-align: center;'>Page {st.session_state.catalog_page + 1} of {page_count} · {total} products</div>", unsafe_allow_html=True)
+                    with col_next:
+                        if st.button("Next ▶", key="catalog_next", disabled=st.session_state.catalog_page >= page_count - 1, use_container_width=True):
+                            st.session_state.catalog_page += 1
+                            rerun_fragment()
+    if st.session_state.selected_image_id_catalog:
         st.markdown('<div class="selected-image-container">', unsafe_allow_html=True)
         col_img, col_btn = st.columns([0.6, 0.4])
         with col_img:
-            st.markdown(f"#### Selected: {st.session_state.selected_image_name}")
-            image = Image.open(io.BytesIO(st.session_state.selected_image))
-            st.image(image)
+            st.markdown(f"#### Selected: {st.session_state.selected_image_name_catalog}")
+            preview = selected_image_preview("catalog")
+            if preview:
+                st.image(preview)
         with col_btn:
             if st.button("🔄 Change"):
-                st.session_state.selected_image = None
-                st.session_state.selected_image_name = None
-                st.session_state.current_product_key = None
-                st.rerun()
+                clear_selection("catalog")
+                rerun_fragment()
         st.markdown('</div>', unsafe_allow_html=True)
         create_video(key_suffix="catalog")
 
-# Custom Upload Tab
-with tab2:
+def show_upload():
+    """Custom Upload tab: ingestion, the selected upload and its generation panel"""
     col1, col2 = st.columns([0.4, 0.6])
     with col1:
         st.markdown("### Upload Your Image")
         uploaded_file = st.file_uploader(
             "Choose an image file",
             type=["png", "jpg", "jpeg"],
-            help="For best results, use a 1280x720 resolution image"
+            help="For best results, use a 1280x720 resolution image",
+            max_upload_size=max(1, MAX_UPLOAD_BYTES // 2 ** 20)
         )
+        upload = None
         if uploaded_file:
-            image_bytes = uploaded_file.read()
-            st.image(image_bytes, caption="Preview", use_container_width=True)
+            upload = ingested_upload(uploaded_file)
+        else:
+            # The file was removed; so is its normalized copy.
+            st.session_state.pop("ingested_upload", None)
+        if upload:
+            width, height = upload.source_size
+            st.image(upload.preview, caption=f"Preview ({width}x{height})", use_container_width=True)
             if st.button("Use This Image", use_container_width=True):
-                st.session_state.selected_image = image_bytes
-                st.session_state.selected_image_name = "Custom Image"
-                st.session_state.current_product_key = None
-                st.rerun()
+                select_image("custom", upload.image_bytes, "Custom Image")
+                rerun_fragment()
     with col2:
-        if st.session_state.selected_image:
+        if st.session_state.selected_image_id_custom:
             st.markdown('<div class="selected-image-container">', unsafe_allow_html=True)
             col_img, col_btn = st.columns([0.8, 0.2])
             with col_img:
-                st.markdown(f"#### Selected: {st.session_state.selected_image_name}")
-                image = Image.open(io.BytesIO(st.session_state.selected_image))
-                st.image(image, use_container_width=True)
+                st.markdown(f"#### Selected: {st.session_state.selected_image_name_custom}")
+                preview = selected_image_preview("custom")
+                if preview:
+                    st.image(preview, use_container_width=True)
             with col_btn:
                 if st.button("🔄 Change", key="change_custom"):
-                    st.session_state.selected_image = None
-                    st.session_state.selected_image_name = None
-                    st.session_state.current_product_key = None
-                    st.rerun()
+                    clear_selection("custom")
+                    rerun_fragment()
             st.markdown('</div>', unsafe_allow_html=True)
             create_video(key_suffix="custom")
 
+def show_sidebar():
+    # --- LinkedIn Post Card ---
+    linkedin_text = (
+        "🌟 Check out this AI-generated video created using Amazon Bedrock and Nova Reel! "
+        "#AI #AWS #AWSSummitBengaluru"
+    )
+    st.markdown(
+        f"""
+        <div style="
+            background: linear-gradient(90deg, #0077b5 0%, #00a0dc 100%);
+            padding: 1.1em 1em 1em 1em;
+            border-radius: 14px;
+            margin-bottom: 1.5em;
+            box-shadow: 0 2px 8px rgba(0,0,0,0.07);
+            color: white;
+        ">
+            <div style="display: flex; align-items: center;">
+                <img src="https://cdn-icons-png.flaticon.com/512/174/174857.png" width="28" style="margin-right: 0.7em; border-radius: 6px; box-shadow: 0 2px 6px rgba(0,0,0,0.07);" />
+                <span style="font-weight: 600; font-size: 1.09em;">Share on LinkedIn</span>
+            </div>
+            <div style="margin-top: 1em; background: rgba(255,255,255,0.13); border-radius: 8px; padding: 0.8em; color: #fff;">
+                {linkedin_text}
+            </div>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+    st.code(linkedin_text, language="markdown")  # Built-in copy button[2][6]
+
+    # --- Creative Prompts ---
+    st.markdown("### 💡 Creative Prompts")
+    for prompt in CREATIVE_PROMPTS:
+        if st.button(prompt, key=f"prompt_{prompt}", use_container_width=True):
+            st.session_state.current_prompt = prompt
+            # The prompt seeds every tab's generation panel, so this one reruns the app.
+            st.rerun()
+
+# Page configuration
+st.set_page_config(
+    page_title="AI Motion Ad Creator",
+    page_icon="🎬",
+    layout="wide",
+    initial_sidebar_state="collapsed"
+)
+
+# Inject custom CSS
+st.markdown(custom_css, unsafe_allow_html=True)
+
+# Modern animated header
+st.markdown("""
+    <div class="header-container">
+        <h1 style='font-size: 2.5rem; font-weight: 700; margin-bottom: 0.5rem;'>🎬 AI Motion Ad Creator</h1>
+        <p style='font-size: 1.2rem; opacity: 0.9;'>Transform your product images into stunning video content with AI</p>
+    </div>
+""", unsafe_allow_html=True)
+
+# Initialize session state
+if 'current_prompt' not in st.session_state:
+    st.session_state.current_prompt = ""
+for panel in ("catalog", "custom"):
+    for field in ("selected_image_id", "selected_image_name", "selected_product_key", "selected_product_etag"):
+        if f"{field}_{panel}" not in st.session_state:
+            st.session_state[f"{field}_{panel}"] = None
+for panel in ("catalog", "custom", "prompt"):
+    # A new session (reload, reconnect) picks up this user's recent job per panel.
+    if f"job_id_{panel}" not in st.session_state:
+        st.session_state[f"job_id_{panel}"] = job_store().latest(user_id(), panel)
+
+with st.sidebar:
+    run_fragment("sidebar", show_sidebar)
+
+# Main content area
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["📑 Product Catalog", "⬆️ Custom Upload", "✏️ Prompt Only", "📦 Batch", "🎞️ My Videos"])
+
+# Each tab is a fragment, so interacting with it reruns only that tab
+# Product Catalog Tab
+with tab1, timed("render_tab", tab="catalog"):
+    run_fragment("catalog", show_catalog)
+
+# Custom Upload Tab
+with tab2, timed("render_tab", tab="upload"):
+    run_fragment("upload", show_upload)
+
 # Custom Prompt Tab (NEW)
-with tab3:
-    create_video_from_prompt()
+with tab3, timed("render_tab", tab="prompt"):
+    run_fragment("prompt", create_video_from_prompt)
+
+# Batch Tab
+with tab4, timed("render_tab", tab="batch"):
+    run_fragment("batch_form", create_batch)
+
+# History Tab
+with tab5, timed("render_tab", tab="history"):
+    show_history()
 
 # Footer
 st.markdown("""
@@ -347,3 +561,5 @@ st.markdown("""
         <p style='margin-bottom: 0.5rem;'>Created using Amazon Bedrock and Nova Reel 1.1</p>
     </div>
 """, unsafe_allow_html=True)
+
+observe_rerun(time.perf_counter() - rerun_started, kind="script")
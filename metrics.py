@@ -0,0 +1,190 @@
+"""In-process latency histograms and counters.
+
+Exported in Prometheus text format on the ops server (``/metrics``) and,
+with ``METRICS_FILE`` set, to a file the server process rewrites every few
+seconds (see ``start_metrics_file``). With
+``METRICS_JSON_LOG`` set (a path, or ``-`` for stderr) every observation
+is also written as one JSON line.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+from ops_server import add_route
+
+DURATION_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1, 2.5, 5, 10, 30, 60, 120, 300, 600
+)
+METRICS_FILE = os.environ.get("METRICS_FILE")
+METRICS_JSON_LOG = os.environ.get("METRICS_JSON_LOG")
+METRICS_FILE_INTERVAL_SECONDS = 15
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+json_logger = logging.getLogger("summit.metrics")
+
+
+def _labels(labels: Dict[str, object]) -> LabelSet:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: LabelSet, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (
+        '{}="{}"'.format(key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._lock = threading.Lock()
+        self._values: Dict[LabelSet, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                yield f"{self.name}{_format_labels(labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts..., sum, count]
+        self._values: Dict[LabelSet, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self) -> Dict[LabelSet, Tuple[float, int]]:
+        """``(sum, count)`` per label set, for diffing two points in time"""
+        with self._lock:
+            return {labels: (series[-2], series[-1]) for labels, series in self._values.items()}
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            for labels, series in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, series):
+                    yield f"{self.name}_bucket{_format_labels(labels, (('le', str(bound)),))} {count}"
+                yield f"{self.name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {series[-1]}"
+                yield f"{self.name}_sum{_format_labels(labels)} {series[-2]}"
+                yield f"{self.name}_count{_format_labels(labels)} {series[-1]}"
+
+
+STAGE_DURATION = Histogram("summit_stage_duration_seconds", "Duration of each request/generation stage")
+RERUN_DURATION = Histogram("summit_rerun_duration_seconds", "Duration of Streamlit script and fragment reruns")
+EVENTS = Counter("summit_events_total", "Counted events such as cache hits and stage errors")
+
+_METRICS = (STAGE_DURATION, RERUN_DURATION, EVENTS)
+
+
+def render_prometheus() -> str:
+    return "\n".join(line for metric in _METRICS for line in metric.render()) + "\n"
+
+
+def _log(record: dict):
+    if METRICS_JSON_LOG:
+        json_logger.info(json.dumps(record, default=str))
+
+
+def observe(stage: str, seconds: float, **labels):
+    """Record a stage duration measured elsewhere (e.g. queue or generation time)"""
+    STAGE_DURATION.observe(seconds, stage=stage, **labels)
+    _log({"ts": time.time(), "type": "stage", "stage": stage, "seconds": round(seconds, 6), **labels})
+
+
+def count(event: str, **labels):
+    EVENTS.inc(event=event, **labels)
+    _log({"ts": time.time(), "type": "event", "event": event, **labels})
+
+
+@contextmanager
+def timed(stage: str, **labels):
+    """Time the enclosed block as ``stage``; failures are tagged ``outcome="error"``"""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException as e:
+        # Streamlit's rerun/stop signals are control flow, not failures.
+        if type(e).__name__ not in ("RerunException", "StopException"):
+            outcome = "error"
+        raise
+    finally:
+        observe(stage, time.perf_counter() - started, outcome=outcome, **labels)
+
+
+def observe_rerun(seconds: float, **labels):
+    RERUN_DURATION.observe(seconds, **labels)
+    _log({"ts": time.time(), "type": "rerun", "seconds": round(seconds, 6), **labels})
+
+
+def _write_metrics_file():
+    while True:
+        time.sleep(METRICS_FILE_INTERVAL_SECONDS)
+        tmp_path = f"{METRICS_FILE}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(render_prometheus())
+        os.replace(tmp_path, METRICS_FILE)
+
+
+def _setup():
+    add_route("/metrics", lambda: (200, "text/plain; version=0.0.4", render_prometheus()))
+    if METRICS_JSON_LOG:
+        handler = logging.StreamHandler(sys.stderr) if METRICS_JSON_LOG == "-" else logging.FileHandler(METRICS_JSON_LOG)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        json_logger.addHandler(handler)
+        json_logger.setLevel(logging.INFO)
+        json_logger.propagate = False
+
+
+_setup()
+
+_file_started = False
+_file_lock = threading.Lock()
+
+
+def start_metrics_file():
+    """With ``METRICS_FILE`` set, rewrite it from this process's registry (once per process).
+
+    Called by the server only: worker processes import this module too, and
+    their empty registries would overwrite the server's file.
+    """
+    global _file_started
+    with _file_lock:
+        if _file_started or not METRICS_FILE:
+            return
+        _file_started = True
+    threading.Thread(target=_write_metrics_file, name="metrics-file", daemon=True).start()
@@ -0,0 +1,59 @@
+import json
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Tuple
+
+# Port for the ops endpoints (readiness, metrics); 0 disables the server.
+OPS_PORT = int(os.environ.get("OPS_PORT", 8502))
+# Loopback only by default; set to 0.0.0.0 for health checks from outside the host.
+OPS_HOST = os.environ.get("OPS_HOST", "127.0.0.1")
+
+logger = logging.getLogger(__name__)
+
+# path -> handler returning (status, content type, body)
+_routes: Dict[str, Callable[[], Tuple[int, str, str]]] = {}
+_server = None
+_server_lock = threading.Lock()
+
+
+def add_route(path: str, handler: Callable[[], Tuple[int, str, str]]):
+    _routes[path] = handler
+
+
+def json_response(status: int, payload) -> Tuple[int, str, str]:
+    return status, "application/json", json.dumps(payload)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        handler = _routes.get(self.path.split("?", 1)[0])
+        if handler is None:
+            status, content_type, body = 404, "text/plain", "not found\n"
+        else:
+            status, content_type, body = handler()
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("ops %s", format % args)
+
+
+def start_ops_server(port: int = OPS_PORT, host: str = OPS_HOST):
+    """Serve the registered ops routes on a daemon thread (once per process)"""
+    global _server
+    with _server_lock:
+        if _server is not None or not port:
+            return
+        try:
+            _server = ThreadingHTTPServer((host, port), _Handler)
+        except OSError as e:
+            logger.warning("Ops server not started on %s:%s: %s", host, port, e)
+            _server = False
+            return
+        threading.Thread(target=_server.serve_forever, name="ops-server", daemon=True).start()
@@ -0,0 +1,161 @@
+"""Poster frames and low-bitrate preview clips for finished videos.
+
+When the tracker settles a job as Completed, its ``output.mp4`` is
+streamed to a temp file and ffmpeg extracts ``poster.jpg`` and
+``preview.mp4``, which are uploaded next to it under ``OUTPUT_S3_PREFIX``.
+Needs ``ffmpeg`` on PATH; without it videos are simply shown without a
+poster.
+"""
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from jobs import Job, get_job_tracker
+from metrics import timed
+from presign import BROWSER_CACHE_CONTROL, get_presigned_url_cache
+
+POSTER_NAME = "poster.jpg"
+PREVIEW_NAME = "preview.mp4"
+POSTER_WIDTH = 640
+POSTER_OFFSET_SECONDS = 1
+PREVIEW_WIDTH = 426
+PREVIEW_BITRATE = "250k"
+POSTPROCESS_WORKERS = int(os.environ.get("POSTPROCESS_WORKERS", 2))
+FFMPEG_TIMEOUT_SECONDS = 120
+ASSET_URL_EXPIRES_SECONDS = 3600 * 24
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+# Not built here for lack of ffmpeg; remembered so lookups do not keep checking S3.
+UNAVAILABLE = "unavailable"
+
+FFMPEG = shutil.which("ffmpeg")
+
+logger = logging.getLogger(__name__)
+
+
+def _ffmpeg(*args: str):
+    subprocess.run(
+        [FFMPEG, "-hide_banner", "-loglevel", "error", "-y", "-threads", "2", *args],
+        check=True,
+        capture_output=True,
+        timeout=FFMPEG_TIMEOUT_SECONDS
+    )
+
+
+class Postprocessor:
+    """Builds poster frames and previews for completed jobs on a small worker pool.
+
+    Each output is handled once per process. Outputs this process did not
+    see complete (earlier runs, other replicas) are discovered on first
+    lookup and built if missing. Without ffmpeg each output is checked
+    once, for assets another replica built.
+    """
+
+    def __init__(self, aws_manager, max_workers: int = POSTPROCESS_WORKERS):
+        self.aws_manager = aws_manager
+        self._lock = threading.Lock()
+        self._state: Dict[str, str] = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="postprocess")
+        if FFMPEG is None:
+            logger.warning("ffmpeg not found on PATH; videos will be shown without posters or previews")
+
+    def on_job_settled(self, job: Job):
+        if job.status == "Completed" and job.s3_uri:
+            self.schedule(job.s3_uri)
+
+    def schedule(self, s3_uri: str):
+        if FFMPEG is None:
+            return
+        with self._lock:
+            if s3_uri in self._state:
+                return
+            self._state[s3_uri] = PENDING
+        self._pool.submit(self._build, s3_uri)
+
+    def assets(self, s3_uri: str) -> Optional[Dict[str, str]]:
+        """Presigned ``poster`` and ``preview`` URLs for a job's output, or None until they exist"""
+        with self._lock:
+            state = self._state.get(s3_uri)
+        if state is None:
+            state = self._discover(s3_uri)
+        if state != READY:
+            return None
+        bucket, poster_key, preview_key = self._locations(s3_uri)
+        s3_client = self.aws_manager.s3_for_bucket(bucket)
+        return {
+            name: get_presigned_url_cache().get(s3_client, bucket, key, expires=ASSET_URL_EXPIRES_SECONDS,
+                                                ResponseCacheControl=BROWSER_CACHE_CONTROL)
+            for name, key in (("poster", poster_key), ("preview", preview_key))
+        }
+
+    def _locations(self, s3_uri: str) -> Tuple[str, str, str]:
+        bucket, video_key = self.aws_manager.get_output_location(s3_uri)
+        prefix = video_key.rsplit("/", 1)[0]
+        return bucket, f"{prefix}/{POSTER_NAME}", f"{prefix}/{PREVIEW_NAME}"
+
+    def _discover(self, s3_uri: str) -> str:
+        bucket, _, preview_key = self._locations(s3_uri)
+        try:
+            # The preview is uploaded last, so its presence means both exist.
+            self.aws_manager.s3_for_bucket(bucket).head_object(Bucket=bucket, Key=preview_key)
+        except ClientError:
+            if FFMPEG is None:
+                with self._lock:
+                    self._state[s3_uri] = UNAVAILABLE
+                return UNAVAILABLE
+            self.schedule(s3_uri)
+            return PENDING
+        with self._lock:
+            self._state[s3_uri] = READY
+        return READY
+
+    def _build(self, s3_uri: str):
+        bucket, video_key = self.aws_manager.get_output_location(s3_uri)
+        _, poster_key, preview_key = self._locations(s3_uri)
+        try:
+            with timed("postprocess"), tempfile.TemporaryDirectory(prefix="summit-postprocess-") as workdir:
+                source = os.path.join(workdir, "output.mp4")
+                with open(source, "wb") as f:
+                    for chunk in self.aws_manager.iter_object_chunks(bucket, video_key):
+                        f.write(chunk)
+                poster = os.path.join(workdir, POSTER_NAME)
+                preview = os.path.join(workdir, PREVIEW_NAME)
+                _ffmpeg("-ss", str(POSTER_OFFSET_SECONDS), "-i", source, "-frames:v", "1",
+                        "-vf", f"scale={POSTER_WIDTH}:-2", "-q:v", "4", poster)
+                _ffmpeg("-i", source, "-vf", f"scale={PREVIEW_WIDTH}:-2", "-c:v", "libx264",
+                        "-preset", "veryfast", "-b:v", PREVIEW_BITRATE, "-an", "-movflags", "+faststart", preview)
+                for path, key, content_type in ((poster, poster_key, "image/jpeg"),
+                                                (preview, preview_key, "video/mp4")):
+                    self.aws_manager.s3_for_bucket(bucket).upload_file(
+                        path, bucket, key,
+                        ExtraArgs={"ContentType": content_type, "CacheControl": BROWSER_CACHE_CONTROL}
+                    )
+            state = READY
+        except Exception as e:
+            logger.warning("Error building poster/preview for %s: %s", s3_uri, e)
+            state = FAILED
+        with self._lock:
+            self._state[s3_uri] = state
+
+
+_postprocessor: Optional[Postprocessor] = None
+_postprocessor_lock = threading.Lock()
+
+
+def get_postprocessor(aws_manager) -> Postprocessor:
+    """Return the process-wide postprocessor, subscribing it to job completions on first use"""
+    global _postprocessor
+    with _postprocessor_lock:
+        if _postprocessor is None:
+            _postprocessor = Postprocessor(aws_manager)
+            get_job_tracker(aws_manager.bedrock_runtime).add_listener(_postprocessor.on_job_settled)
+        return _postprocessor
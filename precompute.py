@@ -0,0 +1,158 @@
+"""Precomputed model-ready reference images for the whole catalog.
+
+Every product under each ``PRODUCT_CATEGORIES`` prefix gets the exact
+1280x720 JPEG the model is sent, stored at ``catalog.prepared_key`` (under
+``PREPARED_CATALOG_PREFIX``, keyed by the source ETag). Catalog selections
+and batches then download those bytes and skip decoding, resizing and
+re-encoding on the request path. Runs are incremental: only products whose
+current ETag has no prepared copy are processed::
+
+    python precompute.py [--category "Nature"] [--prune]
+
+Set ``PRECOMPUTE_IMAGES=1`` to also run it in the background at startup.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Set
+
+from catalog import get_catalog_index, prepared_key
+from config import AWS_REGION, CATALOG_BUCKET, PREPARED_CATALOG_PREFIX, PRODUCT_CATEGORIES
+from image_pipeline import model_ready_jpeg
+from metrics import timed
+
+PRECOMPUTE_WORKERS = 8
+PRECOMPUTE_IMAGES = os.environ.get("PRECOMPUTE_IMAGES", "").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger(__name__)
+
+
+def list_prepared(s3_client, bucket: str, prefix: str = PREPARED_CATALOG_PREFIX) -> Set[str]:
+    paginator = s3_client.get_paginator('list_objects_v2')
+    keys = set()
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        keys.update(obj['Key'] for obj in page.get('Contents', []))
+    return keys
+
+
+class Precomputer:
+    """Builds missing prepared images: S3 transfers on threads, resizing in worker processes"""
+
+    def __init__(self, s3_client, bucket: str = CATALOG_BUCKET, workers: int = PRECOMPUTE_WORKERS,
+                 processes: Optional[int] = None):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.workers = workers
+        self.processes = processes
+
+    def run(self, categories: Dict[str, str], prune: bool = False) -> List[dict]:
+        existing = list_prepared(self.s3_client, self.bucket)
+        with ProcessPoolExecutor(max_workers=self.processes,
+                                 mp_context=multiprocessing.get_context("spawn")) as process_pool, \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="precompute") as pool:
+            return [
+                self._run_category(category, prefix, existing, process_pool, pool, prune)
+                for category, prefix in categories.items()
+            ]
+
+    def _run_category(self, category: str, prefix: str, existing: Set[str], process_pool, pool,
+                      prune: bool) -> dict:
+        started = time.perf_counter()
+        index = get_catalog_index(self.bucket, prefix)
+        # Always list afresh; the index may be serving a cached listing.
+        index.invalidate()
+        products = index.products(self.s3_client)
+        missing = [product for product in products if prepared_key(product['key'], product['etag']) not in existing]
+        results = list(pool.map(lambda product: self._prepare(product, process_pool), missing))
+        report = {
+            "category": category,
+            "products": len(products),
+            "prepared": results.count(True),
+            "failed": results.count(False),
+            "unchanged": len(products) - len(missing),
+        }
+        if prune:
+            current = {prepared_key(product['key'], product['etag']) for product in products}
+            stale = sorted(key for key in existing
+                           if key.startswith(PREPARED_CATALOG_PREFIX + prefix) and key not in current)
+            # delete_objects takes at most 1000 keys per call.
+            for start in range(0, len(stale), 1000):
+                self.s3_client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": key} for key in stale[start:start + 1000]], "Quiet": True}
+                )
+            report["pruned"] = len(stale)
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        return report
+
+    def _prepare(self, product: dict, process_pool) -> bool:
+        try:
+            with timed("precompute_image"):
+                body = self.s3_client.get_object(Bucket=self.bucket, Key=product['key'])['Body'].read()
+                prepared = process_pool.submit(model_ready_jpeg, body).result()
+                self.s3_client.put_object(
+                    Bucket=self.bucket,
+                    Key=prepared_key(product['key'], product['etag']),
+                    Body=prepared,
+                    ContentType="image/jpeg",
+                    Metadata={"source-key": product['key'], "source-etag": product['etag'].strip('"')}
+                )
+            return True
+        except Exception as e:
+            logger.warning("Error precomputing %s: %s", product['key'], e)
+            return False
+
+
+def _run_in_background(region: str):
+    from aws_utils import get_aws_manager
+
+    try:
+        report = Precomputer(get_aws_manager(region).s3_client).run(PRODUCT_CATEGORIES)
+        logger.info("Precompute: %s", json.dumps(report))
+    except Exception as e:
+        # Selections fall back to preparing the original image.
+        logger.warning("Precompute failed: %s", e)
+
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def start_precompute(region: str = AWS_REGION):
+    """With ``PRECOMPUTE_IMAGES`` set, fill in missing prepared images in the background (once per process)"""
+    global _started
+    with _start_lock:
+        if _started or not PRECOMPUTE_IMAGES:
+            return
+        _started = True
+    threading.Thread(target=_run_in_background, args=(region,), name="precompute", daemon=True).start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute model-ready JPEGs for catalog products.")
+    parser.add_argument("--category", action="append", default=[],
+                        help=f"One of {', '.join(PRODUCT_CATEGORIES)}; repeat for several (default: all)")
+    parser.add_argument("--bucket", default=CATALOG_BUCKET)
+    parser.add_argument("--region", default=AWS_REGION)
+    parser.add_argument("--workers", type=int, default=PRECOMPUTE_WORKERS, help="Concurrent S3 transfers")
+    parser.add_argument("--processes", type=int, default=None, help="Resize worker processes (default: CPU count)")
+    parser.add_argument("--prune", action="store_true",
+                        help="Delete prepared images whose source changed or was removed")
+    args = parser.parse_args(argv)
+    categories = {category: PRODUCT_CATEGORIES[category] for category in args.category} or PRODUCT_CATEGORIES
+
+    import boto3
+    from aws_utils import CLIENT_CONFIG
+
+    s3_client = boto3.client("s3", region_name=args.region, config=CLIENT_CONFIG)
+    report = Precomputer(s3_client, args.bucket, args.workers, args.processes).run(categories, args.prune)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
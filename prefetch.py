@@ -0,0 +1,148 @@
+"""Prefetch of catalog image bytes ahead of "Select".
+
+When a session shows a catalog page, the products on it and the
+category's most often selected products are fetched on a small thread
+pool into a shared, size-capped cache, so a selection is served from
+memory instead of an S3 round trip. A session's queued fetches are
+cancelled as soon as it shows something else (another category, page or
+search) or selects a product.
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from image_pipeline import prepare_image
+from metrics import count, timed
+
+PREFETCH_MAX_BYTES = int(os.environ.get("PREFETCH_MAX_BYTES", 64 * 1024 * 1024))
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", 4))
+PREFETCH_POPULAR = 6
+
+_CacheKey = Tuple[str, str, str]
+
+
+class Prefetcher:
+    """Shared LRU of catalog image bytes keyed by (bucket, key, ETag), filled ahead of selection"""
+
+    def __init__(self, aws_manager, max_bytes: int = PREFETCH_MAX_BYTES, max_workers: int = PREFETCH_WORKERS):
+        self.aws_manager = aws_manager
+        self.max_bytes = max_bytes
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[_CacheKey, bytes]" = OrderedDict()
+        self._size = 0
+        # Fetch -> sessions still wanting it; a fetch nobody wants is cancelled.
+        self._pending: Dict[_CacheKey, Tuple[Future, Set[str]]] = {}
+        self._wanted: Dict[str, Set[_CacheKey]] = {}
+        self._selections: Dict[Tuple[str, str], int] = {}
+
+    def prefetch(self, owner: str, bucket: str, products: List[dict]):
+        """Fetch ``products`` for ``owner``, replacing whatever it asked for before"""
+        with self._lock:
+            keys = [(bucket, product['key'], product['etag']) for product in products]
+            keys = [cache_key for cache_key in dict.fromkeys(keys) if cache_key not in self._cache]
+            previous = self._wanted.pop(owner, set())
+            self._release(owner, previous.difference(keys))
+            for cache_key in keys:
+                if cache_key in self._pending:
+                    self._pending[cache_key][1].add(owner)
+                else:
+                    future = self._pool.submit(self._fetch, cache_key)
+                    self._pending[cache_key] = (future, {owner})
+            if keys:
+                self._wanted[owner] = set(keys)
+
+    def cancel(self, owner: str):
+        """Drop ``owner``'s queued fetches that no other session is waiting for"""
+        with self._lock:
+            self._release(owner, self._wanted.pop(owner, set()))
+
+    def _release(self, owner: str, keys: Set[_CacheKey]):
+        for cache_key in keys:
+            pending = self._pending.get(cache_key)
+            if pending is None:
+                continue
+            future, owners = pending
+            owners.discard(owner)
+            # Fetches already running are left to finish into the cache.
+            if not owners and future.cancel():
+                del self._pending[cache_key]
+                count("prefetch", result="cancelled")
+
+    def popular(self, bucket: str, products: List[dict], limit: int = PREFETCH_POPULAR) -> List[dict]:
+        """The ``limit`` most often selected of ``products``"""
+        with self._lock:
+            counts = {product['key']: self._selections.get((bucket, product['key']), 0) for product in products}
+        ranked = sorted((product for product in products if counts[product['key']]),
+                        key=lambda product: counts[product['key']], reverse=True)
+        return ranked[:limit]
+
+    def load(self, bucket: str, product: dict) -> Optional[bytes]:
+        """Bytes for a product the user just selected, from the cache when prefetched"""
+        cache_key = (bucket, product['key'], product['etag'])
+        with self._lock:
+            self._selections[(bucket, product['key'])] = self._selections.get((bucket, product['key']), 0) + 1
+            image_bytes = self._cache.get(cache_key)
+            if image_bytes is not None:
+                self._cache.move_to_end(cache_key)
+        if image_bytes is not None:
+            try:
+                # Verifies the image and warms its preview, as a direct load does.
+                prepare_image(image_bytes)
+                count("prefetch", result="hit")
+                return image_bytes
+            except Exception:
+                self._discard(cache_key)
+        count("prefetch", result="miss")
+        return self.aws_manager.load_image_from_s3(bucket, product['key'])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"images": len(self._cache), "bytes": self._size, "pending": len(self._pending)}
+
+    def _fetch(self, cache_key: _CacheKey):
+        bucket, key, etag = cache_key
+        try:
+            with timed("prefetch_image"):
+                # The original, which is what a selection shows.
+                response = self.aws_manager.s3_client.get_object(Bucket=bucket, Key=key, IfMatch=etag)
+                image_bytes = response['Body'].read()
+        except Exception:
+            # Selection falls back to a direct load.
+            image_bytes = None
+        with self._lock:
+            _, owners = self._pending.pop(cache_key, (None, ()))
+            for owner in owners:
+                wanted = self._wanted.get(owner)
+                if wanted is not None:
+                    wanted.discard(cache_key)
+                    if not wanted:
+                        del self._wanted[owner]
+            if image_bytes is None or len(image_bytes) > self.max_bytes or cache_key in self._cache:
+                return
+            self._cache[cache_key] = image_bytes
+            self._size += len(image_bytes)
+            while self._size > self.max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _discard(self, cache_key: _CacheKey):
+        with self._lock:
+            image_bytes = self._cache.pop(cache_key, None)
+            if image_bytes is not None:
+                self._size -= len(image_bytes)
+
+
+_prefetcher: Optional[Prefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher(aws_manager) -> Prefetcher:
+    """Return the process-wide prefetcher, creating it on first use"""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher(aws_manager)
+        return _prefetcher
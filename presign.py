@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from metrics import timed
+
+PRESIGN_EXPIRES_SECONDS = 3600
+# Never hand out a URL with less than this much life left.
+PRESIGN_SAFETY_MARGIN_SECONDS = 300
+# URLs this close to their reuse deadline are re-signed in the background.
+PRESIGN_REFRESH_AHEAD_SECONDS = 600
+# Lets browsers and CDNs keep the object for the life of the URL.
+BROWSER_CACHE_CONTROL = "private, max-age=3000"
+MAX_CACHED_URLS = 50000
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _SignedUrl:
+    url: str
+    signed_at: float
+    # When the URL stops working: its own expiry or that of the credentials it was signed with.
+    valid_until: float
+
+
+def _credentials_expiry(s3_client, signed_at: float) -> Optional[float]:
+    """Expiry of the credentials ``s3_client`` signs with; None for long-lived access keys.
+
+    A URL signed with temporary credentials (instance or task role, STS)
+    stops working when their session token does, whatever its ``X-Amz-Expires``.
+    """
+    credentials = getattr(s3_client._request_signer, "_credentials", None)
+    if credentials is None or not getattr(credentials, "token", None):
+        return None
+    expiry = getattr(credentials, "_expiry_time", None)
+    # A session token of unknown lifetime: do not reuse the URL.
+    return expiry.timestamp() if expiry is not None else signed_at
+
+
+class PresignedUrlCache:
+    """Reuses presigned GET URLs per (bucket, key, parameters).
+
+    A URL is signed once per window and handed out unchanged until a safety
+    margin before it (or the temporary credentials that signed it) expires,
+    so reruns render byte-identical URLs and the browser's HTTP cache keeps
+    working. URLs nearing the end of their
+    window are re-signed on a background thread so callers never wait.
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHED_URLS):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, _SignedUrl]" = OrderedDict()
+        self._refreshing = set()
+        self._refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="presign-refresh")
+
+    def get(self, s3_client, bucket: str, key: str, expires: int = PRESIGN_EXPIRES_SECONDS, **params) -> str:
+        """Return a presigned ``get_object`` URL; extra ``params`` (e.g. ``ResponseContentDisposition``) are signed in"""
+        cache_key = (bucket, key, expires, tuple(sorted(params.items())))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+        if entry is not None:
+            deadline = entry.valid_until - PRESIGN_SAFETY_MARGIN_SECONDS
+            if now < deadline:
+                if now >= deadline - PRESIGN_REFRESH_AHEAD_SECONDS:
+                    self._schedule_refresh(s3_client, cache_key)
+                return entry.url
+        return self._sign(s3_client, cache_key).url
+
+    def _sign(self, s3_client, cache_key: tuple) -> _SignedUrl:
+        bucket, key, expires, params = cache_key
+        with timed("presign"):
+            url = s3_client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': bucket, 'Key': key, **dict(params)},
+                ExpiresIn=expires
+            )
+        signed_at = time.time()
+        valid_until = signed_at + expires
+        credentials_expiry = _credentials_expiry(s3_client, signed_at)
+        if credentials_expiry is not None:
+            valid_until = min(valid_until, credentials_expiry)
+        entry = _SignedUrl(url, signed_at, valid_until)
+        with self._lock:
+            self._entries[cache_key] = entry
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _schedule_refresh(self, s3_client, cache_key: tuple):
+        with self._lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+
+        def refresh():
+            try:
+                self._sign(s3_client, cache_key)
+            except Exception as e:
+                logger.warning("Error refreshing presigned URL for %s: %s", cache_key[:2], e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(cache_key)
+
+        self._refresher.submit(refresh)
+
+
+_cache: Optional[PresignedUrlCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_presigned_url_cache() -> PresignedUrlCache:
+    """Return the process-wide presigned URL cache, creating it on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PresignedUrlCache()
+        return _cache
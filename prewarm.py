@@ -0,0 +1,115 @@
+"""Startup prewarm of the catalog and cold-start measurement.
+
+Deliberately light on imports: the heavy modules (boto3, PIL) are imported
+inside the prewarm thread so they are timed and never delay the server.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ops_server import add_route, json_response
+
+PROCESS_START = time.time()
+PREWARM_WORKERS = 8
+PREWARM_IMAGES = os.environ.get("PREWARM_IMAGES", "").lower() in ("1", "true", "yes")
+STARTUP_REPORT_PATH = os.environ.get("STARTUP_REPORT_PATH")
+
+logger = logging.getLogger(__name__)
+
+_ready = threading.Event()
+_report = {"ready": False}
+_started = False
+_start_lock = threading.Lock()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def startup_report() -> dict:
+    return dict(_report)
+
+
+def _prewarm_category(aws_manager, bucket: str, category: str, prefix: str) -> dict:
+    from image_pipeline import prepare_image
+
+    started = time.perf_counter()
+    products = aws_manager.list_products(bucket, prefix)
+    listed = time.perf_counter()
+    for product in products:
+        aws_manager.presign_catalog_image(bucket, product['key'])
+    signed = time.perf_counter()
+    prepared = 0
+    if PREWARM_IMAGES:
+        first_page, _ = aws_manager.get_product_page(bucket, prefix)
+        for product in first_page:
+            body = aws_manager.s3_client.get_object(Bucket=bucket, Key=product['key'])['Body'].read()
+            prepare_image(body)
+            prepared += 1
+    return {
+        "category": category,
+        "products": len(products),
+        "list_seconds": round(listed - started, 3),
+        "presign_seconds": round(signed - listed, 3),
+        "prepared_images": prepared,
+        "total_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _run(region: str):
+    try:
+        started = time.perf_counter()
+        # Timed separately so cold-start import cost can be tracked per release.
+        from aws_utils import get_aws_manager
+        from config import CATALOG_BUCKET, PRODUCT_CATEGORIES
+        _report["import_seconds"] = round(time.perf_counter() - started, 3)
+
+        client_started = time.perf_counter()
+        aws_manager = get_aws_manager(region)
+        aws_manager.warm_up()
+        _report["client_seconds"] = round(time.perf_counter() - client_started, 3)
+
+        prewarm_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=PREWARM_WORKERS, thread_name_prefix="prewarm") as pool:
+            futures = [
+                pool.submit(_prewarm_category, aws_manager, CATALOG_BUCKET, category, prefix)
+                for category, prefix in PRODUCT_CATEGORIES.items()
+            ]
+            categories = []
+            for future in futures:
+                try:
+                    categories.append(future.result())
+                except Exception as e:
+                    logger.warning("Prewarm failed for a category: %s", e)
+        _report["categories"] = categories
+        _report["prewarm_seconds"] = round(time.perf_counter() - prewarm_started, 3)
+    except Exception as e:
+        # A failed prewarm only costs the first users latency; never block readiness on it.
+        logger.warning("Prewarm failed: %s", e)
+        _report["error"] = str(e)
+    finally:
+        _report["ready"] = True
+        _report["ready_after_seconds"] = round(time.time() - PROCESS_START, 3)
+        _ready.set()
+        logger.info("Startup: %s", json.dumps(_report))
+        if STARTUP_REPORT_PATH:
+            with open(STARTUP_REPORT_PATH, "w") as f:
+                json.dump(_report, f, indent=2)
+
+
+def _ready_route():
+    return json_response(200 if is_ready() else 503, startup_report())
+
+
+def start_prewarm(region: str = "us-east-1"):
+    """Prewarm every catalog category in the background (once per process)"""
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    add_route("/ready", _ready_route)
+    threading.Thread(target=_run, args=(region,), name="prewarm", daemon=True).start()
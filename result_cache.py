@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from jobs import Job
+
+RESULT_CACHE_TTL_SECONDS = int(os.environ.get("RESULT_CACHE_TTL_SECONDS", 24 * 3600))
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", 1024))
+
+
+def request_key(model_id: str, model_input: dict) -> str:
+    """Hash everything that determines a generated video.
+
+    The prompt is whitespace-normalized and reference images are reduced to
+    a digest of their prepared bytes, so identical requests from different
+    sessions share a key.
+    """
+    params = model_input["textToVideoParams"]
+    images = [
+        hashlib.sha256(image["source"]["bytes"].encode("utf-8")).hexdigest()
+        for image in params.get("images", [])
+    ]
+    normalized = {
+        "modelId": model_id,
+        "taskType": model_input["taskType"],
+        "text": " ".join(params["text"].split()),
+        "images": images,
+        "videoGenerationConfig": model_input["videoGenerationConfig"],
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """LRU map from request keys to the job that produced (or is producing) them.
+
+    A completed job is served until ``ttl`` seconds after it finished, an
+    in-flight job is shared with every identical request, and failed jobs
+    are never reused.
+    """
+
+    def __init__(self, ttl: float = RESULT_CACHE_TTL_SECONDS, max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Job]" = OrderedDict()
+        # Key -> [lock, threads holding or waiting for it]; dropped when the count reaches zero.
+        self._key_locks: Dict[str, list] = {}
+
+    def get(self, key: str) -> Optional[Job]:
+        with self._lock:
+            job = self._entries.get(key)
+            if job is None:
+                return None
+            expired = job.completed_at is not None and time.time() - job.completed_at > self.ttl
+            if job.status == "Failed" or expired:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return job
+
+    def put(self, key: str, job: Job):
+        with self._lock:
+            self._entries[key] = job
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_submit(self, key: str, submit: Callable[[], Job]) -> Job:
+        """Return the cached job for ``key`` or call ``submit`` exactly once to create it"""
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                job = self.get(key)
+                if job is None:
+                    job = submit()
+                    self.put(key, job)
+                return job
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Return the process-wide result cache, creating it on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
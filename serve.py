@@ -0,0 +1,35 @@
+"""Launch the app with the catalog prewarm and ops endpoints started first.
+
+    python serve.py [streamlit run options...]
+
+Runs ``streamlit run main.py`` in this process, so the caches filled by the
+prewarm are the ones the app uses. Probe ``http://localhost:$OPS_PORT/ready``
+for readiness.
+"""
+import os
+import sys
+
+from config import AWS_REGION
+from prewarm import start_prewarm
+from ops_server import start_ops_server
+from metrics import start_metrics_file
+
+
+def main():
+    start_prewarm(AWS_REGION)
+    # Imported here: it pulls in PIL and botocore, which prewarm defers.
+    from precompute import start_precompute
+
+    start_precompute(AWS_REGION)
+    start_ops_server()
+    start_metrics_file()
+
+    from streamlit.web import cli as stcli
+
+    main_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    sys.argv = ["streamlit", "run", main_script, *sys.argv[1:]]
+    sys.exit(stcli.main())
+
+
+if __name__ == "__main__":
+    main()
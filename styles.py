@@ -194,6 +194,14 @@ custom_css = """
         border-radius: 3px;
     }
 
+    /* Result Video */
+    .result-video {
+        width: 100%;
+        aspect-ratio: 16 / 9;
+        background: #000;
+        border-radius: 8px;
+    }
+
     /* Download Button */
     .download-button {
         display: inline-block;
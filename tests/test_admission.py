@@ -0,0 +1,53 @@
+import time
+
+from admission import Region, SubmissionQueue
+from benchmarks.fakes import FakeBedrockRuntime
+from jobs import JobTracker
+
+
+def start(region: Region) -> str:
+    output_config = {"s3OutputDataConfig": {"s3Uri": f"s3://{region.bucket}/outputs/"}}
+    return region.submit_client.start_async_invoke(
+        modelId="amazon.nova-reel-v1:0", modelInput={}, outputDataConfig=output_config
+    )["invocationArn"]
+
+
+def wait_for(condition, timeout: float) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def test_throttled_region_does_not_stall_the_others():
+    # Region A answers slowly and always throttles, as botocore retries would make it.
+    throttled = FakeBedrockRuntime(duration=60, start_latency=2.0, throttle_rate=1.0)
+    healthy = FakeBedrockRuntime(duration=60, start_latency=0.0)
+    tracker = JobTracker(healthy, expected_duration=60)
+    queue = SubmissionQueue(tracker, regions=[
+        Region("region-a", "bucket-a", throttled, max_concurrent=10, rate=1000, burst=10),
+        Region("region-b", "bucket-b", healthy, max_concurrent=10, rate=1000, burst=10),
+    ])
+    jobs = [queue.enqueue(f"session-{i}", start) for i in range(5)]
+
+    started_in_b = lambda count: sum(job.status == "InProgress" and job.region == "region-b" for job in jobs) >= count
+    # Everything but the job stuck in region A's call drains to B meanwhile...
+    assert wait_for(lambda: started_in_b(4), timeout=1.0)
+    assert throttled.calls.get("start_async_invoke") == 1
+    # ...and that one follows once A throttles it back into the queue.
+    assert wait_for(lambda: started_in_b(5), timeout=5.0)
+    assert throttled.calls["start_async_invoke"] == 1
+
+
+def test_retryable_errors_requeue_instead_of_failing():
+    runtime = FakeBedrockRuntime(duration=60, start_latency=0.0, throttle_rate=1.0)
+    tracker = JobTracker(runtime, expected_duration=60)
+    region = Region("region-a", "bucket-a", runtime, max_concurrent=10, rate=1000, burst=10)
+    queue = SubmissionQueue(tracker, regions=[region])
+    job = queue.enqueue("session", start)
+
+    assert wait_for(lambda: region.retry_at > time.monotonic(), timeout=1.0)
+    assert job.status == "Queued"
+    assert queue.queued() == 1
@@ -0,0 +1,88 @@
+import base64
+import functools
+import io
+
+import pytest
+from PIL import Image
+
+from image_pipeline import MODEL_IMAGE_SIZE, _load_bounded, ingest_upload, prepare_image
+
+
+def png(img: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@functools.lru_cache(maxsize=None)
+def large_pngs():
+    """PNGs big enough to be reduced before resizing, in modes ``reduce()`` does not take"""
+    size = (3000, 2000)
+    noise = Image.effect_noise(size, 64).convert("RGB")
+    palette = noise.convert("P", palette=Image.ADAPTIVE)
+    transparent = palette.copy()
+    transparent.info["transparency"] = 0
+    return {
+        "palette": png(palette),
+        "palette-transparent": png(transparent),
+        "1-bit": png(noise.convert("1")),
+        "16-bit": png(Image.new("I;16", size, 30000)),
+    }
+
+
+def multi_picture_jpeg(size) -> bytes:
+    """Two-picture MPO, as phone cameras save them"""
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "red").save(buffer, "MPO", save_all=True, append_images=[Image.new("RGB", size, "blue")])
+    return buffer.getvalue()
+
+
+def test_multi_picture_jpeg_upload_is_accepted():
+    data = multi_picture_jpeg((3000, 2000))
+    assert Image.open(io.BytesIO(data)).format == "MPO"
+
+    upload = ingest_upload(io.BytesIO(data), len(data))
+
+    assert upload.source_size == (3000, 2000)
+    normalized = Image.open(io.BytesIO(upload.image_bytes))
+    assert normalized.format == "JPEG"
+    assert normalized.width >= MODEL_IMAGE_SIZE[0] and normalized.height >= MODEL_IMAGE_SIZE[1]
+
+
+def test_multi_picture_jpeg_decodes_at_reduced_scale():
+    img = _load_bounded(Image.open(io.BytesIO(multi_picture_jpeg((4000, 3000)))))
+    # DCT scaling to 1/2; a full decode followed by reduce() would give 1333x1000.
+    assert img.size == (2000, 1500)
+
+
+def test_multi_picture_jpeg_uses_the_jpeg_pixel_budget():
+    # Over the JPEG budget (64 MP); a KeyError here would crash the Upload tab.
+    data = multi_picture_jpeg((10000, 7000))
+    with pytest.raises(ValueError, match="JPEG uploads are limited"):
+        ingest_upload(io.BytesIO(data), len(data))
+
+
+@pytest.mark.parametrize("name", list(large_pngs()))
+def test_large_png_in_any_mode_is_prepared(name):
+    prepared = prepare_image(large_pngs()[name])
+
+    assert prepared.source_size == (3000, 2000)
+    assert prepared.resized
+    model_image = Image.open(io.BytesIO(base64.b64decode(prepared.model_payload)))
+    assert model_image.size == MODEL_IMAGE_SIZE
+    assert model_image.mode == "RGB"
+
+
+def test_large_palette_png_upload_is_accepted():
+    data = large_pngs()["palette"]
+
+    upload = ingest_upload(io.BytesIO(data), len(data))
+
+    assert upload.source_size == (3000, 2000)
+    assert Image.open(io.BytesIO(upload.image_bytes)).size == (1280, 853)
+
+
+def test_truncated_png_upload_is_reported_as_damaged():
+    data = large_pngs()["palette"][:-4096]
+    with pytest.raises(ValueError, match="damaged or incomplete"):
+        ingest_upload(io.BytesIO(data), len(data))
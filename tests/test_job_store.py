@@ -0,0 +1,31 @@
+from benchmarks.fakes import FakeBedrockRuntime
+from job_store import INTERRUPTED_MESSAGE, JobStore, restore_job
+from jobs import QUEUED, JobTracker
+
+
+def test_job_queued_by_a_dead_process_is_not_reattached_as_queued(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    # The process that queued the job exits before submitting it.
+    dead_store = JobStore(path)
+    orphan = JobTracker(FakeBedrockRuntime(duration=60)).enqueue()
+    dead_store.record(orphan, "user", "a prompt", "panel", "key")
+
+    store = JobStore(path)
+    tracker = JobTracker(FakeBedrockRuntime(duration=60))
+    assert store.latest("user", "panel") is None
+    assert store.find_reusable("key", 3600) is None
+
+    job = restore_job(store, tracker, orphan.job_id)
+    assert job.status == "Failed"
+    assert job.failure_message == INTERRUPTED_MESSAGE
+    assert store.load(orphan.job_id).status == "Failed"
+
+
+def test_own_queued_job_is_reattached(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    tracker = JobTracker(FakeBedrockRuntime(duration=60))
+    queued = tracker.enqueue()
+    store.record(queued, "user", "a prompt", "panel", "key")
+
+    assert store.latest("user", "panel") == queued.job_id
+    assert restore_job(store, tracker, queued.job_id).status == QUEUED
@@ -0,0 +1,21 @@
+import boto3
+from moto import mock_aws
+
+from catalog import load_prepared_image
+from precompute import Precomputer
+from tests.test_image_pipeline import large_pngs
+
+
+def test_large_palette_and_16_bit_catalog_pngs_are_prepared():
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="catalog-bucket")
+        for mode in ("palette", "16-bit"):
+            s3.put_object(Bucket="catalog-bucket", Key=f"shirts/{mode}.png", Body=large_pngs()[mode])
+
+        [report] = Precomputer(s3, "catalog-bucket", workers=2, processes=1).run({"Shirts": "shirts/"})
+
+        assert (report["prepared"], report["failed"]) == (2, 0)
+        for mode in ("palette", "16-bit"):
+            etag = s3.head_object(Bucket="catalog-bucket", Key=f"shirts/{mode}.png")["ETag"]
+            assert load_prepared_image(s3, "catalog-bucket", f"shirts/{mode}.png", etag).startswith(b"\xff\xd8")
@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from jobs import Job
+from result_cache import ResultCache
+
+
+def test_waiters_share_one_retry_after_a_failed_submit():
+    cache = ResultCache()
+    calls = []
+    first_started, release_first = threading.Event(), threading.Event()
+    retry_started, release_retry = threading.Event(), threading.Event()
+
+    def submit():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            first_started.set()
+            release_first.wait(5)
+            raise RuntimeError("throttled")
+        retry_started.set()
+        release_retry.wait(5)
+        return Job(job_id=f"job-{len(calls)}")
+
+    results = {}
+
+    def request(name):
+        try:
+            results[name] = cache.get_or_submit("key", submit)
+        except RuntimeError as e:
+            results[name] = e
+
+    first = threading.Thread(target=request, args=("first",))
+    first.start()
+    assert first_started.wait(5)
+    waiter = threading.Thread(target=request, args=("waiter",))
+    waiter.start()
+    # Let the waiter block on the key lock before the first submit fails.
+    time.sleep(0.1)
+    release_first.set()
+    assert retry_started.wait(5)
+    # Arrives while the waiter's retry is in progress: must wait for it, not submit again.
+    late = threading.Thread(target=request, args=("late",))
+    late.start()
+    time.sleep(0.1)
+    release_retry.set()
+    for thread in (first, waiter, late):
+        thread.join(5)
+
+    assert len(calls) == 2
+    assert isinstance(results["first"], RuntimeError)
+    assert results["late"] is results["waiter"]
+    assert not cache._key_locks
+
+
+def test_failed_jobs_are_not_reused():
+    cache = ResultCache()
+    cache.put("key", Job(job_id="failed", status="Failed"))
+    job = cache.get_or_submit("key", lambda: Job(job_id="retry"))
+    assert job.job_id == "retry"
+
+
+@pytest.mark.parametrize("status", ["InProgress", "Completed"])
+def test_live_jobs_are_shared(status):
+    cache = ResultCache()
+    cache.put("key", Job(job_id="live", status=status, completed_at=time.time()))
+    assert cache.get_or_submit("key", lambda: Job(job_id="duplicate")).job_id == "live"
@@ -0,0 +1,110 @@
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+from metrics import timed
+
+THUMBNAIL_SIZE = (360, 360)
+THUMBNAIL_FORMAT = "WEBP"
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_CACHE_DIR = os.environ.get(
+    "THUMBNAIL_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "summit-webapp-thumbnails")
+)
+
+logger = logging.getLogger(__name__)
+
+
+def make_thumbnail(image_bytes: bytes, size=THUMBNAIL_SIZE) -> bytes:
+    """Downscale an image to fit within ``size`` and encode it for the grid.
+
+    Runs in a worker process, so it only takes and returns bytes.
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    # Let the JPEG decoder skip most of the pixels up front.
+    img.draft("RGB", size)
+    img.thumbnail(size, Image.LANCZOS)
+    if img.mode not in ("RGB", "RGBA"):
+        has_alpha = img.mode in ("LA", "PA") or "transparency" in img.info
+        img = img.convert("RGBA" if has_alpha else "RGB")
+    out = io.BytesIO()
+    img.save(out, format=THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY)
+    return out.getvalue()
+
+
+class ThumbnailCache:
+    """Disk cache of catalog thumbnails keyed by source ETag.
+
+    ``thumbnails_for`` returns the thumbnails that are ready and schedules
+    the rest: S3 reads run on a thread pool and resizing on a process pool,
+    so the grid falls back to the original URL until a thumbnail lands.
+    """
+
+    def __init__(self, cache_dir: str = THUMBNAIL_CACHE_DIR, max_workers: Optional[int] = None):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self._process_pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self._fetch_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="thumbnail-fetch")
+        self._lock = threading.Lock()
+        self._in_progress = set()
+
+    def path_for(self, etag: str) -> str:
+        digest = hashlib.sha1(etag.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.{THUMBNAIL_FORMAT.lower()}")
+
+    def thumbnails_for(self, s3_client, bucket: str, products: List[dict]) -> Dict[str, str]:
+        """Map product keys to local thumbnail paths for those already built"""
+        ready = {}
+        for product in products:
+            path = self.path_for(product['etag'])
+            if os.path.exists(path):
+                ready[product['key']] = path
+            else:
+                self._schedule(s3_client, bucket, product['key'], path)
+        return ready
+
+    def _schedule(self, s3_client, bucket: str, key: str, path: str):
+        with self._lock:
+            if path in self._in_progress:
+                return
+            self._in_progress.add(path)
+        self._fetch_pool.submit(self._build, s3_client, bucket, key, path)
+
+    def _build(self, s3_client, bucket: str, key: str, path: str):
+        try:
+            with timed("thumbnail_build"):
+                source = s3_client.get_object(Bucket=bucket, Key=key)['Body'].read()
+                thumbnail = self._process_pool.submit(make_thumbnail, source).result()
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(thumbnail)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("Error building thumbnail for s3://%s/%s: %s", bucket, key, e)
+        finally:
+            with self._lock:
+                self._in_progress.discard(path)
+
+
+_cache: Optional[ThumbnailCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """Return the process-wide thumbnail cache, creating it on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ThumbnailCache()
+        return _cache